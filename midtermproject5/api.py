@@ -0,0 +1,357 @@
+"""Read-only HTTP/JSON API over the fast food dataset.
+
+Serves the same computations as the Streamlit dashboard without going
+through the UI:
+
+    GET /brands/top?n=10&state=CA         top brands (optionally in a state)
+    GET /states?n=15&brand=Subway         state breakdown (optionally for a brand)
+    GET /states/compare?states=CA,TX&n=8  per state summary and top brands
+    GET /locations?state=NY&brand=KFC&limit=100&offset=0
+    GET /nearest?lat=40.7&lon=-74.0&k=5&brand=Subway
+    GET /export?format=csv|parquet|geojson&state=TX&brand=Subway
+
+All answers come from indexes built once at startup (a state x brand count
+matrix and the array-backed ``RestaurantStore``); nearest-location queries
+use a k-d tree over the locations as unit vectors, built per brand on first
+use. Responses are cached by
+normalized query, carry an ETag and honour ``If-None-Match``; connections
+are kept alive between requests. Exports are not cached; they are streamed
+with chunked transfer encoding as the rows are encoded.
+
+Run with:  python api.py --port 8000 --data FastFoodRestaurants.csv
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from dataset import DASHBOARD_COLUMNS, read_restaurants
+from export import EXPORT_FORMATS
+from geocheck import unit_vectors
+from lazyimports import lazy_import
+from restaurants import RestaurantStore
+
+spatial = lazy_import('scipy.spatial')
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FastFoodRestaurants.csv')
+EARTH_RADIUS_KM = 6371.0088
+MAX_LIMIT = 1000
+
+
+class QueryError(Exception):
+    """Raised for invalid query parameters (answered with HTTP 400)."""
+
+
+def _int_param(params, key, default, low=1, high=MAX_LIMIT):
+    try:
+        value = int(params.get(key, default))
+    except ValueError:
+        raise QueryError(f"'{key}' must be an integer")
+    return min(max(value, low), high)
+
+
+def _float_param(params, key, low, high):
+    if key not in params:
+        raise QueryError(f"'{key}' is required")
+    try:
+        value = float(params[key])
+    except ValueError:
+        raise QueryError(f"'{key}' must be a number")
+    if not math.isfinite(value) or not low <= value <= high:
+        raise QueryError(f"'{key}' must be between {low} and {high}")
+    return value
+
+
+class QueryEngine:
+    """Dashboard computations answered from in-memory indexes."""
+
+    def __init__(self, df):
+        df = df.copy()
+        df.columns = df.columns.str.strip()
+        self.df = df
+        self.store = RestaurantStore.from_frame(df)
+        store = self.store
+        # State x brand location counts; every aggregate is a slice of it
+        self.counts = np.zeros((len(store.states), len(store.brands)), dtype=np.int64)
+        valid = (store.state_codes >= 0) & (store.brand_codes >= 0)
+        np.add.at(self.counts, (store.state_codes[valid], store.brand_codes[valid]), 1)
+        self.fingerprint = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy()).hexdigest()
+        self._trees = {}  # brand code (None for all) -> (k-d tree, row positions)
+        self._trees_lock = threading.Lock()
+
+    def _state_code(self, state):
+        code = self.store.states.code(state)
+        if code < 0:
+            raise QueryError(f"unknown state '{state}'")
+        return code
+
+    def _brand_code(self, brand):
+        code = self.store.brands.code(brand)
+        if code < 0:
+            raise QueryError(f"unknown brand '{brand}'")
+        return code
+
+    def _top(self, counts, labels, n):
+        order = np.argsort(-counts, kind='stable')[:n]
+        return [{'name': labels[i], 'count': int(counts[i])} for i in order if counts[i] > 0]
+
+    def top_brands(self, n=10, state=None):
+        counts = self.counts[self._state_code(state)] if state else self.counts.sum(axis=0)
+        total = int(counts.sum())
+        top = self._top(counts, self.store.brands, n)
+        for item in top:
+            item['share'] = round(item['count'] / total * 100, 2) if total else 0.0
+        return {'state': state, 'total': total, 'brands': top}
+
+    def state_breakdown(self, n=15, brand=None):
+        counts = self.counts[:, self._brand_code(brand)] if brand else self.counts.sum(axis=1)
+        return {'brand': brand, 'total': int(counts.sum()), 'states': self._top(counts, self.store.states, n)}
+
+    def compare_states(self, states, n=8):
+        result = []
+        for state in states:
+            row = self.counts[self._state_code(state)]
+            top = self._top(row, self.store.brands, n)
+            result.append({
+                'state': state,
+                'total': int(row.sum()),
+                'unique_brands': int(np.count_nonzero(row)),
+                'top_brand': top[0]['name'] if top else None,
+                'brands': top,
+            })
+        return {'states': result}
+
+    def locations(self, state=None, brand=None, limit=100, offset=0):
+        if state:
+            self._state_code(state)
+        if brand:
+            self._brand_code(brand)
+        indices = self.store.select(state or None, brand or None)
+        page = indices[offset:offset + limit]
+        return {
+            'total': int(len(indices)),
+            'offset': offset,
+            'locations': [r.as_dict() for r in self.store.records(page)],
+        }
+
+    def _tree(self, brand_code):
+        with self._trees_lock:
+            if brand_code not in self._trees:
+                store = self.store
+                indices = store.select(None, store.brands[brand_code]) if brand_code is not None else np.arange(len(store))
+                indices = indices[~(np.isnan(store.latitude[indices]) | np.isnan(store.longitude[indices]))]
+                points = unit_vectors(store.longitude[indices].astype(np.float64),
+                                      store.latitude[indices].astype(np.float64))
+                self._trees[brand_code] = (spatial.cKDTree(points), indices)
+            return self._trees[brand_code]
+
+    def nearest(self, lat, lon, k=5, brand=None):
+        tree, indices = self._tree(self._brand_code(brand) if brand else None)
+        k = min(k, len(indices))
+        if k == 0:
+            return {'locations': []}
+        chords, nearest = tree.query(unit_vectors(np.array([lon]), np.array([lat]))[0], k=k)
+        locations = []
+        for chord, i in zip(np.atleast_1d(chords), np.atleast_1d(nearest)):
+            record = self.store[int(indices[i])].as_dict()
+            # Chord length on the unit sphere -> great-circle distance
+            record['distance_km'] = round(float(2 * EARTH_RADIUS_KM * np.arcsin(min(chord / 2, 1.0))), 3)
+            locations.append(record)
+        return {'locations': locations}
+
+    def export(self, params):
+        """Return the chunk iterator and MIME type for an export request."""
+        export_format = params.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise QueryError(f"'format' must be one of {', '.join(EXPORT_FORMATS)}")
+        state, brand = params.get('state'), params.get('brand')
+        if state:
+            self._state_code(state)
+        if brand:
+            self._brand_code(brand)
+        exporter, mime, _ = EXPORT_FORMATS[export_format]
+        return exporter(self.df, self.store.select(state or None, brand or None)), mime
+
+    def handle(self, path, params):
+        """Dispatch a request path and query parameters to a computation."""
+        if path == '/brands/top':
+            return self.top_brands(_int_param(params, 'n', 10), params.get('state'))
+        if path == '/states':
+            return self.state_breakdown(_int_param(params, 'n', 15), params.get('brand'))
+        if path == '/states/compare':
+            states = [s for s in params.get('states', '').split(',') if s]
+            if not states:
+                raise QueryError("'states' is required")
+            return self.compare_states(states, _int_param(params, 'n', 8))
+        if path == '/locations':
+            return self.locations(params.get('state'), params.get('brand'),
+                                  _int_param(params, 'limit', 100),
+                                  _int_param(params, 'offset', 0, low=0, high=len(self.store)))
+        if path == '/nearest':
+            return self.nearest(_float_param(params, 'lat', -90, 90), _float_param(params, 'lon', -180, 180),
+                                _int_param(params, 'k', 5, high=100), params.get('brand'))
+        return None
+
+
+class ResponseCache:
+    """LRU cache of encoded responses keyed by path and normalized query."""
+
+    def __init__(self, engine, maxsize=4096):
+        self.engine = engine
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, path, query):
+        params = dict(parse_qsl(query, keep_blank_values=False))
+        key = (path, tuple(sorted(params.items())))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        try:
+            payload = self.engine.handle(path, params)
+            status = 200 if payload is not None else 404
+            if payload is None:
+                payload = {'error': f"unknown endpoint '{path}'"}
+        except QueryError as e:
+            status, payload = 400, {'error': str(e)}
+        body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(self.engine.fingerprint.encode() + body).hexdigest()[:16]
+        entry = (status, body, etag)
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def _response(status, body=b'', etag=None, keep_alive=True):
+    headers = [
+        f"HTTP/1.1 {status} {REASONS[status]}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Cache-Control: public, max-age=60",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if etag:
+        headers.append(f"ETag: {etag}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode('latin-1') + body
+
+
+async def _stream_export(engine, query, writer, keep_alive, head=False):
+    try:
+        chunks, mime = engine.export(dict(parse_qsl(query)))
+    except QueryError as e:
+        body = json.dumps({'error': str(e)}).encode('utf-8')
+        writer.write(_response(400, b'' if head else body, keep_alive=keep_alive))
+        return
+    headers = [
+        "HTTP/1.1 200 OK",
+        f"Content-Type: {mime}",
+        "Transfer-Encoding: chunked",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode('latin-1'))
+    if head:
+        # A HEAD response ends with its headers; a chunk terminator would be
+        # read as the next response on a keep-alive connection
+        return
+    while True:
+        # Encode the next chunk off the event loop so other connections keep going
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        if chunk:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            await writer.drain()
+    writer.write(b"0\r\n\r\n")
+
+
+async def _serve_connection(cache, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                writer.write(_response(400, b'{"error":"malformed request"}', keep_alive=False))
+                break
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+            if method not in ('GET', 'HEAD'):
+                writer.write(_response(405, b'{"error":"method not allowed"}', keep_alive=keep_alive))
+            else:
+                url = urlsplit(target)
+                path = url.path.rstrip('/') or '/'
+                if path == '/export':
+                    await _stream_export(cache.engine, url.query, writer, keep_alive, head=method == 'HEAD')
+                    await writer.drain()
+                    if not keep_alive:
+                        break
+                    continue
+                status, body, etag = cache.get(path, url.query)
+                if status == 200 and headers.get('if-none-match') == etag:
+                    writer.write(_response(304, etag=etag, keep_alive=keep_alive))
+                else:
+                    writer.write(_response(status, b'' if method == 'HEAD' else body, etag, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(engine, host='127.0.0.1', port=8000, sock=None):
+    cache = ResponseCache(engine)
+
+    async def handler(reader, writer):
+        await _serve_connection(cache, reader, writer)
+
+    if sock is not None:
+        server = await asyncio.start_server(handler, sock=sock)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fast food dataset as a JSON API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data', default=DEFAULT_DATA, help="path or URL of FastFoodRestaurants.csv")
+    args = parser.parse_args()
+
+    engine = QueryEngine(read_restaurants(args.data, DASHBOARD_COLUMNS))
+    print(f"Serving {len(engine.store)} restaurants on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(engine, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
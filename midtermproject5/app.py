@@ -1,9 +1,59 @@
+import io
+import os
+
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 
+from artifacts import ARTIFACTS_ENV, FINGERPRINT_ENV, ArtifactStore, dataset_fingerprint
+from catchment import PopulationGrid, catchment_summary
+from clusters import DEFAULT_EPS_KM, DEFAULT_MIN_SAMPLES, cluster_summary, find_clusters
+from dataset import DASHBOARD_COLUMNS, LAZY_COLUMNS, compact_strings, decode_strings, memory_report, read_restaurants
+from domains import DomainIndex
+from export import EXPORT_FORMATS
+from geocheck import StateBoundaries, check_states
+from hierarchy import GeoHierarchy
+from lazyimports import import_report, lazy_import
+from loader import BackgroundLoader, source_fingerprint
+from marketstructure import brand_features, classify_brands, concentration
+from memory import budget
+from plotting import draw_brand_points, draw_small_multiples
+from querycache import FilterCache
+from restaurants import RestaurantStore
+from sampling import LevelOfDetailSampler
+from shared_data import DATA_SOURCE_ENV, SHARED_DATA_ENV, read_shared_frame
+from similarity import RegionalPreferences
+from sketches import SketchIndex
+from snapshots import SnapshotStore
+from topk import top_k, top_k_per_group
+
+# Plotting libraries are imported on the first chart, after the loading
+# progress and the first metrics are already on screen
+sns = lazy_import('seaborn')
+plt = lazy_import('matplotlib.pyplot')
+mlines = lazy_import('matplotlib.lines')
+
+# Points drawn in the locations scatter plot before switching to a
+# level-of-detail sample (about one point per 30 pixels of the figure)
+SCATTER_POINT_BUDGET = 20_000
+
+# Directory of dated feed snapshots (see snapshots.py) for the trend charts
+SNAPSHOT_DIR = os.environ.get('FASTFOOD_SNAPSHOTS',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+
+# Optional GeoJSON of state boundary polygons for the state consistency
+# check; without it the check compares each location with its neighbours,
+# which only flags rows and cannot correct them
+STATE_BOUNDARIES = os.environ.get('FASTFOOD_STATE_BOUNDARIES')
+
+# Optional CSV of population points (latitude, longitude, population), e.g.
+# census block centroids, for the catchment population section
+POPULATION_GRID = os.environ.get('FASTFOOD_POPULATION_GRID')
+
+# Precomputed aggregates written by `python artifacts.py` (or by serve.py)
+ARTIFACT_DIR = os.environ.get(ARTIFACTS_ENV,
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts'))
+
 # Configure page
 st.set_page_config(
     page_title="Fast Food Restaurants Analysis",
@@ -22,61 +72,346 @@ examining brand presence, geographic trends, and regional preferences.
 **Dataset Source:** [Kaggle - Fast Food Restaurants Across America](https://www.kaggle.com/datasets/imtkaggleteam/fast-food-restaurants-across-america)
 """)
 
-# Load data function
-@st.cache_data
+# Replace this URL with your actual file URL (serve.py and loadtest.py pass
+# the file they loaded instead, so lazily read columns come from it too)
+DATA_URL = os.environ.get(DATA_SOURCE_ENV,
+                          "https://raw.githubusercontent.com/your-username/your-repo/main/FastFoodRestaurants.csv")
+
+# Background read of the dataset, started by the first session to arrive
+@st.cache_resource
+def start_loading(url):
+    return BackgroundLoader(url, DASHBOARD_COLUMNS)
+
+# Sample data for demonstration when the dataset cannot be loaded
+def sample_data():
+    return pd.DataFrame({
+        'name': ['McDonald\'s', 'Burger King', 'Taco Bell', 'KFC', 'Pizza Hut'] * 100,
+        'province': ['CA', 'TX', 'FL', 'NY', 'OH'] * 100,
+        'latitude': np.random.uniform(25, 49, 500),
+        'longitude': np.random.uniform(-125, -65, 500),
+        'address': ['Sample Address'] * 500
+    })
+
+# Load data function; returns the frame, the load error (None for real data),
+# the per-column memory saved by compacting the string columns and the
+# fingerprint of the source file (None for sample data)
+@budget.cached(st.cache_resource)
 def load_data():
+    load_error = fingerprint = None
     try:
-        # Replace this URL with your actual file URL
-        url = "https://raw.githubusercontent.com/your-username/your-repo/main/FastFoodRestaurants.csv"
-        df = pd.read_csv(url)
-        df.columns = df.columns.str.strip()
-        return df
+        loader = start_loading(DATA_URL)
+        df = loader.take()
+        if df is None:
+            # Evicted after the background load handed its frame over
+            df = read_restaurants(DATA_URL, DASHBOARD_COLUMNS)
+            fingerprint = source_fingerprint(DATA_URL)
+        else:
+            fingerprint = loader.fingerprint
     except Exception as e:
-        st.error(f"Error loading data: {e}")
-        # Create sample data for demonstration
-        sample_data = {
-            'name': ['McDonald\'s', 'Burger King', 'Taco Bell', 'KFC', 'Pizza Hut'] * 100,
-            'province': ['CA', 'TX', 'FL', 'NY', 'OH'] * 100,
-            'latitude': np.random.uniform(25, 49, 500),
-            'longitude': np.random.uniform(-125, -65, 500),
-            'address': ['Sample Address'] * 500
-        }
-        return pd.DataFrame(sample_data)
+        df, load_error = sample_data(), str(e)
+    compact = compact_strings(df)
+    return compact, load_error, memory_report(df, compact), fingerprint
+
+# Page skeleton updated with running totals until the background load is done
+def show_loading_progress(loader):
+    placeholder = st.empty()
+    while not loader.wait(0.2):
+        snapshot = loader.snapshot()
+        with placeholder.container():
+            progress = loader.progress
+            st.progress(progress or 0.0, text=f"Loading dataset… {snapshot['rows']:,} rows so far")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Restaurants Loaded", snapshot['rows'])
+            col2.metric("Brands Seen", snapshot['brands'])
+            col3.metric("States Seen", snapshot['states'])
+            if snapshot['top_brands']:
+                st.write("**Top brands so far:** " + ", ".join(
+                    f"{brand} ({count})" for brand, count in snapshot['top_brands']))
+    placeholder.empty()
+
+# Columns left out of the loaded frame, read only when a view needs them from
+# the source it was loaded from; refused if the source changed since then
+@budget.cached(st.cache_data)
+def load_columns(df, source, columns):
+    extra = read_restaurants(source, ['name', *columns])
+    if len(extra) != len(df) or dataset_fingerprint(extra[['name']]) != dataset_fingerprint(df[['name']]):
+        raise ValueError(f"{source} no longer matches the loaded dataset")
+    return compact_strings(extra[list(columns)].set_axis(df.index))
+
+# Dataset mapped from the file written by serve.py (shared by all workers)
+@budget.cached(st.cache_resource)
+def load_shared_data(path):
+    return read_shared_frame(path)
+
+# Precomputed sketches for the approximate statistics mode
+@budget.cached(st.cache_resource)
+def load_sketches(df, fingerprint):
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.sketches()
+    return SketchIndex(df)
+
+# Array-backed record store for per-location lookups
+@budget.cached(st.cache_resource)
+def load_store(df, fingerprint):
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.store()
+    return RestaurantStore.from_frame(df)
+
+# Per-snapshot brand counts and market share from the snapshot store
+@budget.cached(st.cache_data, ttl=3600)
+def load_brand_trends(directory, brands, state):
+    store = SnapshotStore(directory)
+    if len(store.dates) < 2:
+        return None
+    return store.brand_trends(list(brands), state)
+
+# Per zoom level sampling grid for large map views
+@budget.cached(st.cache_resource)
+def load_sampler(df, fingerprint):
+    store = load_store(df, fingerprint)
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.sampler(store)
+    return LevelOfDetailSampler(store.longitude, store.latitude)
+
+# Precomputed aggregates of the source file with this fingerprint (None if
+# not built, or the frame is not the file as loaded)
+@budget.cached(st.cache_resource)
+def load_artifacts(fingerprint):
+    if fingerprint is None:
+        return None
+    return ArtifactStore(ARTIFACT_DIR).load(fingerprint)
+
+# Sparse state x brand matrix with cached state similarities
+@budget.cached(st.cache_resource)
+def load_preferences(df, fingerprint):
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.preferences()
+    return RegionalPreferences(df)
+
+# State -> city -> ZIP drill-down index
+@budget.cached(st.cache_resource)
+def load_hierarchy(df, fingerprint):
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.hierarchy()
+    return GeoHierarchy(df)
+
+# State boundary polygons with their grid index
+@budget.cached(st.cache_resource)
+def load_boundaries(path):
+    return StateBoundaries.from_geojson(path)
+
+# Coordinate-derived state and mismatch flag for every row
+@budget.cached(st.cache_data)
+def load_state_check(df, fingerprint, boundaries_path):
+    if boundaries_path:
+        return check_states(df, load_boundaries(boundaries_path))
+    artifacts = load_artifacts(fingerprint)
+    if artifacts is not None:
+        return artifacts.state_check(df.index)
+    return check_states(df)
+
+# Population raster for the catchment population section
+@budget.cached(st.cache_resource)
+def load_population_grid(path):
+    return PopulationGrid.from_csv(path)
+
+# Population within radius_km of every restaurant, cached per radius
+@budget.cached(st.cache_data)
+def load_catchment(df, path, radius_km):
+    return load_population_grid(path).catchment(df['longitude'], df['latitude'], radius_km)
+
+# DBSCAN cluster label of every location, cached per parameter set
+@budget.cached(st.cache_data)
+def load_clusters(df, fingerprint, eps_km, min_samples):
+    artifacts = load_artifacts(fingerprint)
+    labels = artifacts.clusters(eps_km, min_samples) if artifacts is not None else None
+    if labels is not None:
+        return labels
+    return find_clusters(df['longitude'], df['latitude'], eps_km, min_samples)
+
+# Brand <-> website domain index, stored with the artifacts or read from the
+# source's websites column (None if it is unavailable)
+@budget.cached(st.cache_resource)
+def load_domain_index(df, fingerprint):
+    artifacts = load_artifacts(fingerprint)
+    domain_index = artifacts.domain_index() if artifacts is not None else None
+    if domain_index is not None:
+        return domain_index
+    try:
+        websites = load_columns(df, DATA_URL, ('websites',))['websites']
+    except Exception:
+        return None
+    return DomainIndex.from_frame(df['name'], websites)
+
+# Location count, state count, spread, website domain (if used) and class of every brand
+@budget.cached(st.cache_data)
+def load_brand_classes(df, fingerprint, use_websites):
+    features = brand_features(df, load_domain_index(df, fingerprint) if use_websites else None)
+    return features.join(classify_brands(features))
+
+# Top brands of the selected states, tiled into one small-multiples image
+@budget.cached(st.cache_data)
+def render_state_comparison(df, fingerprint, states, n_brands=8, n_cols=4):
+    preferences = load_preferences(df, fingerprint)
+    top_states, top_items, top_values = top_k_per_group(preferences.counts, n_brands)
+    panel_of = np.full(len(preferences.states), -1)
+    panel_of[preferences.states.get_indexer(states)] = np.arange(len(states))
+    panels = panel_of[top_states]
+    shown = panels >= 0
+    labels = [brand if len(brand) <= 24 else brand[:23] + "…"
+              for brand in preferences.brands[top_items[shown]]]
+    
+    n_cols = min(n_cols, len(states))
+    n_rows = -(-len(states) // n_cols)
+    fig, ax = plt.subplots(figsize=(4.5 * n_cols, 0.3 * (n_brands + 2) * n_rows))
+    draw_small_multiples(ax, panels[shown], top_values[shown], labels,
+                         [f"Top Brands in {state}" for state in states],
+                         sns.color_palette('mako', n_brands), n_cols)
+    fig.subplots_adjust(left=0.01, right=0.99, top=0.99, bottom=0.01)
+    output = io.BytesIO()
+    fig.savefig(output, format='png')
+    plt.close(fig)
+    return output.getvalue()
+
+# Row positions and overview statistics per filter combination
+@budget.cached(st.cache_resource)
+def load_filter_cache(df):
+    # Results fill the cache after it is built; report their bytes as they come and go
+    return FilterCache(df, max_bytes=budget.limit_bytes // 4,
+                       on_resize=lambda delta: budget.resize('load_filter_cache', delta, df))
 
 # Load the data
-df = load_data()
+shared_path = os.environ.get(SHARED_DATA_ENV)
+load_error = column_memory = None
+if shared_path:
+    df = load_shared_data(shared_path)
+    fingerprint = os.environ.get(FINGERPRINT_ENV)
+else:
+    loader = start_loading(DATA_URL)
+    if not loader.done:
+        show_loading_progress(loader)
+    df, load_error, column_memory, fingerprint = load_data()
+
+if load_error:
+    st.warning(f"⚠️ Showing 500 randomly generated sample rows, not the real dataset. "
+               f"Loading the data failed: {load_error}")
+else:
+    st.caption(f"✅ Showing the full dataset: {len(df):,} restaurants.")
 
 if df is not None:
     # Sidebar for filters
     st.sidebar.header("Filters")
     
+    # Rows whose coordinates place them in another state than their province
+    state_check = None
+    if {'province', 'latitude', 'longitude'} <= set(df.columns):
+        state_check = load_state_check(df, fingerprint, STATE_BOUNDARIES)
+        # Only polygons tell a misfiled row from a border town or a point in Mexico
+        if STATE_BOUNDARIES and st.sidebar.checkbox(
+            "Correct states from coordinates",
+            help=f"Replace the state of the {state_check['province_mismatch'].sum()} locations "
+                 "whose coordinates lie in another state."
+        ):
+            df = df.assign(province=state_check['geo_province'].where(state_check['province_mismatch'], df['province']))
+            # The stored aggregates are of the file's states
+            fingerprint = None
+    
     # State filter
     states = ['All'] + sorted(df['province'].unique().tolist())
     selected_state = st.sidebar.selectbox("Select State:", states)
     
+    # City and ZIP drill-down within the selected state
+    hierarchy = load_hierarchy(df, fingerprint)
+    location_path = () if selected_state == 'All' else (selected_state,)
+    selected_city = selected_zip = 'All'
+    if location_path and 'city' in hierarchy.levels:
+        cities = ['All'] + hierarchy.children(location_path)['city'].tolist()
+        selected_city = st.sidebar.selectbox("Select City:", cities)
+        if selected_city != 'All':
+            location_path += (selected_city,)
+            if 'postalCode' in hierarchy.levels:
+                zips = ['All'] + hierarchy.children(location_path)['postalCode'].tolist()
+                selected_zip = st.sidebar.selectbox("Select ZIP Code:", zips)
+                if selected_zip != 'All':
+                    location_path += (selected_zip,)
+    
     # Brand filter
     brands = ['All'] + sorted(df['name'].unique().tolist())
     selected_brand = st.sidebar.selectbox("Select Brand:", brands)
     
-    # Apply filters
-    filtered_df = df.copy()
-    if selected_state != 'All':
-        filtered_df = filtered_df[filtered_df['province'] == selected_state]
-    if selected_brand != 'All':
-        filtered_df = filtered_df[filtered_df['name'] == selected_brand]
+    # Website domains come with the artifacts; otherwise the websites column
+    # is read from the source only once asked for
+    artifacts = load_artifacts(fingerprint)
+    websites_stored = artifacts is not None and 'domains' in artifacts.manifest['sections']
+    use_websites = st.sidebar.checkbox(
+        "Use brand websites",
+        value=websites_stored,
+        help="Count locations sharing a brand's website domain as a chain, and list "
+             "the brand names that share a domain. Reads the websites column of the dataset."
+    )
+    
+    # Statistics mode
+    approximate = st.sidebar.checkbox(
+        "Approximate statistics",
+        help="Answer the overview and explorer statistics by merging precomputed "
+             "per state/brand sketches instead of scanning the filtered rows."
+    )
+    sketch_state = None if selected_state == 'All' else selected_state
+    sketch_brand = None if selected_brand == 'All' else selected_brand
+    
+    if approximate and selected_city != 'All':
+        st.sidebar.caption("Sketches cover state and brand filters only; showing exact values for the selected city.")
+        approximate = False
+    
+    # Apply filters, reusing the result of a combination seen before
+    def filter_rows():
+        mask = np.ones(len(df), dtype=bool)
+        if selected_brand != 'All':
+            mask &= (df['name'] == selected_brand).to_numpy(dtype=bool, na_value=False)
+        if selected_city != 'All':
+            rows = np.sort(hierarchy.rows(location_path))
+            return rows[mask[rows]]
+        if selected_state != 'All':
+            mask &= (df['province'] == selected_state).to_numpy(dtype=bool, na_value=False)
+        return np.flatnonzero(mask)
+    
+    filter_cache = load_filter_cache(df)
+    filter_result = filter_cache.get(
+        FilterCache.key(selected_state, selected_city, selected_zip, selected_brand), filter_rows)
+    filtered_rows = filter_result.rows
+    filtered_df = df if len(filtered_rows) == len(df) else df.iloc[filtered_rows]
     
     # Dataset Overview
     st.header("📊 Dataset Overview")
     col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.metric("Total Restaurants", len(filtered_df))
-    with col2:
-        st.metric("Unique Brands", filtered_df['name'].nunique())
-    with col3:
-        st.metric("States Covered", filtered_df['province'].nunique())
-    with col4:
-        st.metric("Missing Values", filtered_df.isnull().sum().sum())
+    if approximate:
+        sketches = load_sketches(df, fingerprint)
+        distinct_help = f"HyperLogLog estimate, ±{sketches.distinct_error:.1%} standard error"
+        with col1:
+            st.metric("Total Restaurants", sketches.count(sketch_state, sketch_brand))
+        with col2:
+            st.metric("Unique Brands", sketches.distinct('name', sketch_state, sketch_brand),
+                      help=distinct_help)
+        with col3:
+            st.metric("States Covered", sketches.distinct('province', sketch_state, sketch_brand),
+                      help=distinct_help)
+        with col4:
+            st.metric("Missing Values", sketches.missing_values(sketch_state, sketch_brand))
+    else:
+        with col1:
+            st.metric("Total Restaurants", filter_result.total)
+        with col2:
+            st.metric("Unique Brands", filter_result.unique_brands)
+        with col3:
+            st.metric("States Covered", filter_result.states_covered)
+        with col4:
+            st.metric("Missing Values", filter_result.missing_values)
     
     # Main Analysis Tabs
     tab1, tab2, tab3, tab4 = st.tabs(["Brand Analysis", "Geographic Distribution", "Regional Comparison", "Data Explorer"])
@@ -88,7 +423,7 @@ if df is not None:
         n_brands = st.slider("Number of top brands to display:", 5, 20, 10)
         
         # Top brands chart
-        top_brands = filtered_df['name'].value_counts().head(n_brands)
+        top_brands = filter_result.top_brands(n_brands)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         sns.barplot(x=top_brands.values, y=top_brands.index, palette='viridis', ax=ax)
@@ -96,8 +431,9 @@ if df is not None:
         ax.set_xlabel('Number of Locations')
         ax.set_ylabel('Brand')
         ax.grid(axis='x', alpha=0.3)
-        plt.tight_layout()
+        fig.tight_layout()
         st.pyplot(fig)
+        plt.close(fig)
         
         # Market share
         st.subheader("Market Share Analysis")
@@ -114,13 +450,57 @@ if df is not None:
             st.write("**Market Share (%):**")
             for brand, share in market_share.head(5).items():
                 st.write(f"• {brand}: {share}%")
+        
+        # Trend across the stored feed snapshots
+        trends = load_brand_trends(SNAPSHOT_DIR, tuple(top_brands.head(5).index), sketch_state)
+        if trends is not None:
+            st.subheader("Market Share Trend")
+            trend_counts, trend_share = trends
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+            trend_share.plot(ax=ax1, marker='o')
+            ax1.set_title('Market Share (%) by Snapshot')
+            ax1.set_xlabel('Snapshot Date')
+            ax1.set_ylabel('Market Share (%)')
+            ax1.grid(alpha=0.3)
+            trend_counts.plot(ax=ax2, marker='o', legend=False)
+            ax2.set_title('Locations by Snapshot')
+            ax2.set_xlabel('Snapshot Date')
+            ax2.set_ylabel('Number of Locations')
+            ax2.grid(alpha=0.3)
+            fig.tight_layout()
+            st.pyplot(fig)
+            plt.close(fig)
+        
+        # Chains vs independents and how concentrated each state's market is
+        st.subheader("Market Structure")
+        brand_classes = load_brand_classes(df, fingerprint, use_websites)
+        filtered_locations = pd.Series(filter_result.brand_counts, index=filter_cache.brands)
+        class_locations = filtered_locations.groupby(
+            brand_classes['Class'].reindex(filter_cache.brands).to_numpy()).sum()
+        class_summary = pd.DataFrame({
+            'Brands': brand_classes['Class'][filtered_locations[filtered_locations > 0].index].value_counts(),
+            'Locations': class_locations,
+        }).fillna(0).astype(int)
+        class_summary['Share of Locations (%)'] = (class_summary['Locations'] / max(filter_result.total, 1) * 100).round(1)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Brands by Class:**")
+            st.dataframe(class_summary, use_container_width=True)
+            st.caption("National chains: 10+ states and 800+ km spread. Chains: 3+ locations"
+                       + (", or 2+ sharing the brand's website domain." if use_websites else "."))
+        with col2:
+            st.write("**Most Concentrated States (HHI, 20+ restaurants):**")
+            state_concentration = concentration(load_preferences(df, fingerprint).counts, load_preferences(df, fingerprint).states)
+            state_concentration = state_concentration[state_concentration['Restaurants'] >= 20]
+            st.dataframe(state_concentration.head(10), use_container_width=True)
     
     with tab2:
         st.subheader("Geographic Distribution")
         
         # State distribution
         n_states = st.slider("Number of top states to display:", 5, 25, 15)
-        state_counts = filtered_df['province'].value_counts().head(n_states)
+        state_counts = filter_result.top_states(n_states)
         
         fig, ax = plt.subplots(figsize=(10, 6))
         sns.barplot(x=state_counts.values, y=state_counts.index, palette='crest', ax=ax)
@@ -128,8 +508,24 @@ if df is not None:
         ax.set_xlabel('Number of Locations')
         ax.set_ylabel('State')
         ax.grid(axis='x', alpha=0.3)
-        plt.tight_layout()
+        fig.tight_layout()
         st.pyplot(fig)
+        plt.close(fig)
+        
+        # Drill-down one level below the current state/city selection
+        if len(location_path) < len(hierarchy.levels):
+            level = hierarchy.levels[len(location_path)]
+            level_names = {'province': 'State', 'city': 'City', 'postalCode': 'ZIP Code'}
+            st.subheader(f"Drill-down by {level_names.get(level, level)}")
+            if selected_brand != 'All':
+                drilldown = hierarchy.brand_children(location_path, selected_brand)
+                st.caption(f"{selected_brand} locations per {level_names.get(level, level).lower()}, "
+                           "with all brands for comparison.")
+            else:
+                drilldown = hierarchy.children(location_path)
+            drilldown = (drilldown.drop(columns=['start', 'end'] + list(hierarchy.levels[:len(location_path)]))
+                         .sort_values('Restaurants', ascending=False))
+            st.dataframe(drilldown, use_container_width=True, hide_index=True)
         
         # Distribution analysis
         st.subheader("Geographic Distribution Analysis")
@@ -138,43 +534,116 @@ if df is not None:
             fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
             
             # Latitude distribution
-            filtered_df['latitude'].hist(bins=30, ax=ax1, alpha=0.7, color='skyblue')
+            ax1.hist(filtered_df['latitude'].dropna(), bins=30, alpha=0.7, color='skyblue')
             ax1.set_title('Latitude Distribution')
             ax1.set_xlabel('Latitude')
             ax1.set_ylabel('Frequency')
             ax1.grid(alpha=0.3)
             
             # Longitude distribution
-            filtered_df['longitude'].hist(bins=30, ax=ax2, alpha=0.7, color='lightcoral')
+            ax2.hist(filtered_df['longitude'].dropna(), bins=30, alpha=0.7, color='lightcoral')
             ax2.set_title('Longitude Distribution')
             ax2.set_xlabel('Longitude')
             ax2.set_ylabel('Frequency')
             ax2.grid(alpha=0.3)
             
-            plt.tight_layout()
+            fig.tight_layout()
             st.pyplot(fig)
+            plt.close(fig)
         
         # Scatter plot of locations
-        if len(filtered_df) <= 1000:  # Only show if not too many points
+        if len(filtered_df) > 0:
             st.subheader("Restaurant Locations Scatter Plot")
+            n_colored = st.slider("Number of brands to color:", 1, 20, 5)
+            show_other = st.checkbox("Show other brands", value=False)
             fig, ax = plt.subplots(figsize=(10, 6))
             
-            # Create scatter plot with different colors for different brands
-            brands_for_plot = filtered_df['name'].value_counts().head(5).index
-            colors = sns.color_palette("Set1", len(brands_for_plot))
+            # Encode each point's brand as a color index (top brands first,
+            # everything else shares the last "Other" color) and draw all
+            # points in one call
+            store = load_store(df, fingerprint)
+            point_brands = store.brand_codes[filtered_rows]
+            brand_counts = np.bincount(point_brands[point_brands >= 0], minlength=len(store.brands))
+            brands_for_plot = top_k(brand_counts, n_colored)
+            brands_for_plot = brands_for_plot[brand_counts[brands_for_plot] > 0]
+            color_index = np.full(len(store.brands) + 1, len(brands_for_plot))
+            color_index[brands_for_plot] = np.arange(len(brands_for_plot))
+            point_colors = color_index[point_brands]  # missing brand (-1) maps to "Other"
             
-            for i, brand in enumerate(brands_for_plot):
-                brand_data = filtered_df[filtered_df['name'] == brand]
-                ax.scatter(brand_data['longitude'], brand_data['latitude'], 
-                          label=brand, alpha=0.6, s=30, color=colors[i])
+            palette = sns.color_palette("Set1" if len(brands_for_plot) <= 9 else "tab20", len(brands_for_plot))
+            colors = list(palette) + [(0.6, 0.6, 0.6)]
+            points = np.flatnonzero(point_colors < len(brands_for_plot)) if not show_other else np.arange(len(filtered_rows))
             
+            # Large selections are drawn from a density-preserving sample
+            if len(points) > SCATTER_POINT_BUDGET:
+                sampled_rows = load_sampler(df, fingerprint).sample(filtered_rows[points], SCATTER_POINT_BUDGET)
+                st.caption(f"Showing a spatially stratified sample of {len(sampled_rows):,} "
+                           f"of {len(points):,} locations.")
+                points = points[np.isin(filtered_rows[points], sampled_rows)]
+            coords = store.coordinates(filtered_rows[points])
+            draw_brand_points(ax, coords[:, 0], coords[:, 1], point_colors[points], colors)
+            
+            handles = [mlines.Line2D([], [], marker='o', linestyle='', color=colors[i], label=store.brands[code])
+                       for i, code in enumerate(brands_for_plot)]
+            if show_other:
+                handles.append(mlines.Line2D([], [], marker='o', linestyle='', color=colors[-1], label='Other'))
             ax.set_xlabel('Longitude')
             ax.set_ylabel('Latitude')
             ax.set_title('Restaurant Locations by Brand')
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+            ax.legend(handles=handles, bbox_to_anchor=(1.05, 1), loc='upper left')
+            ax.grid(alpha=0.3)
+            fig.tight_layout()
+            st.pyplot(fig)
+            plt.close(fig)
+        
+        # Dense clusters of locations
+        st.subheader("Restaurant Clusters")
+        col1, col2 = st.columns(2)
+        with col1:
+            eps_km = st.slider("Cluster radius (km):", 0.5, 10.0, DEFAULT_EPS_KM, step=0.5)
+        with col2:
+            min_samples = st.slider("Minimum restaurants per cluster:", 3, 50, DEFAULT_MIN_SAMPLES)
+        cluster_labels = load_clusters(df, fingerprint, eps_km, min_samples)[filtered_rows]
+        clusters = cluster_summary(filtered_df, cluster_labels)
+        if clusters.empty:
+            st.write("No clusters at these settings.")
+        else:
+            st.write(f"**{len(clusters)}** clusters hold {clusters['Restaurants'].sum():,} of the "
+                     f"{len(filtered_rows):,} selected locations.")
+            fig, ax = plt.subplots(figsize=(12, 6))
+            # Background locations from the same bounded sample as the scatter plot
+            background = load_sampler(df, fingerprint).sample(filtered_rows, SCATTER_POINT_BUDGET)
+            coords = load_store(df, fingerprint).coordinates(background)
+            draw_brand_points(ax, coords[:, 0], coords[:, 1], np.zeros(len(background), dtype=np.int64),
+                              ['lightgray'], alpha=1.0, size=2)
+            ax.scatter(clusters['Longitude'], clusters['Latitude'], s=clusters['Restaurants'] * 10,
+                       alpha=0.6, color='crimson', edgecolor='black')
+            ax.set_xlabel('Longitude')
+            ax.set_ylabel('Latitude')
+            ax.set_title('Cluster Centres (size = restaurants in cluster)')
             ax.grid(alpha=0.3)
-            plt.tight_layout()
+            fig.tight_layout()
             st.pyplot(fig)
+            plt.close(fig)
+            st.dataframe(clusters.head(20), use_container_width=True)
+        
+        # People living within a radius of each location
+        st.subheader("Catchment Population")
+        if not POPULATION_GRID:
+            st.caption("Set FASTFOOD_POPULATION_GRID to a CSV of population points "
+                       "(latitude, longitude, population) to see the population each location serves.")
+        elif len(filtered_rows) > 0:
+            radius_km = st.slider("Catchment radius (km):", 1, 50, 10)
+            catchment = load_catchment(df, POPULATION_GRID, radius_km)[filtered_rows]
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Brands by Mean Catchment (10+ locations):**")
+                by_brand = catchment_summary(filtered_df, catchment, 'name')
+                st.dataframe(by_brand[by_brand['Locations'] >= 10].head(15), use_container_width=True)
+            with col2:
+                st.write("**States by Mean Catchment:**")
+                st.dataframe(catchment_summary(filtered_df, catchment, 'province'), use_container_width=True)
     
     with tab3:
         st.subheader("Regional Brand Comparison")
@@ -190,37 +659,22 @@ if df is not None:
         )
         
         if states_to_compare:
-            # Create comparison data
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            axes = axes.flatten()
+            # Top brand of every state in one pass over the state x brand counts
+            preferences = load_preferences(df, fingerprint)
+            top_states, top_items, _ = top_k_per_group(preferences.counts, 1)
+            state_top_brand = pd.Series(preferences.brands[top_items], index=preferences.states[top_states])
             
-            for i, state in enumerate(states_to_compare[:4]):  # Limit to 4 states for display
-                if i < len(axes):
-                    state_data = df[df['province'] == state]
-                    top_brands_state = state_data['name'].value_counts().head(8)
-                    
-                    sns.barplot(x=top_brands_state.values, y=top_brands_state.index, 
-                              palette='mako', ax=axes[i])
-                    axes[i].set_title(f'Top Brands in {state}')
-                    axes[i].set_xlabel('Number of Locations')
-                    axes[i].set_ylabel('Brand')
-                    axes[i].grid(axis='x', alpha=0.3)
-            
-            # Hide unused subplots
-            for i in range(len(states_to_compare), len(axes)):
-                axes[i].set_visible(False)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            # One panel per selected state, drawn into a single image
+            st.image(render_state_comparison(df, fingerprint, tuple(states_to_compare)), use_container_width=True)
             
             # Comparison table
             st.subheader("State Comparison Summary")
             comparison_summary = []
             for state in states_to_compare:
-                state_data = df[df['province'] == state]
-                top_brand = state_data['name'].value_counts().index[0] if len(state_data) > 0 else "N/A"
-                total_count = len(state_data)
-                unique_brands = state_data['name'].nunique()
+                state_counts = preferences.counts[preferences.states.get_loc(state)]
+                top_brand = state_top_brand.get(state, "N/A")
+                total_count = int(state_counts.sum())
+                unique_brands = state_counts.nnz
                 
                 comparison_summary.append({
                     'State': state,
@@ -231,13 +685,49 @@ if df is not None:
             
             comparison_df = pd.DataFrame(comparison_summary)
             st.dataframe(comparison_df, use_container_width=True)
+        
+        # Brand-mix similarity between states and taste regions
+        st.subheader("Regional Taste Similarity")
+        preferences = load_preferences(df, fingerprint)
+        
+        if len(states_to_compare) >= 2:
+            similarity = preferences.similarity(states_to_compare)
+            fig, ax = plt.subplots(figsize=(8, 6))
+            sns.heatmap(similarity, annot=len(states_to_compare) <= 12, fmt='.2f',
+                        cmap='mako', vmin=0, vmax=1, ax=ax)
+            ax.set_title('Cosine Similarity of Brand Mix')
+            fig.tight_layout()
+            st.pyplot(fig)
+            plt.close(fig)
+        
+        n_regions = st.slider("Number of taste regions:", 2, 12, 6)
+        regions = preferences.taste_regions(n_regions)
+        region_table = pd.DataFrame({
+            'Region': range(1, n_regions + 1),
+            'States': [', '.join(regions.index[regions == r]) for r in range(1, n_regions + 1)],
+        })
+        st.dataframe(region_table, use_container_width=True, hide_index=True)
+        
+        if selected_brand != 'All' and selected_brand in preferences.brands:
+            st.write(f"**Brands with the most similar state footprint to {selected_brand}:**")
+            affinity = preferences.brand_affinity(selected_brand, n=5)
+            for brand, score in affinity.items():
+                st.write(f"• {brand}: {score:.2f}")
     
     with tab4:
         st.subheader("Data Explorer")
         
         # Show raw data sample
         st.write("**Dataset Sample:**")
-        st.dataframe(filtered_df.head(10), use_container_width=True)
+        sample = filtered_df.head(10)
+        missing_columns = [c for c in LAZY_COLUMNS if c not in sample.columns]
+        if missing_columns and st.checkbox("Include websites and keys"):
+            try:
+                extra = load_columns(df, DATA_URL, tuple(missing_columns))
+                sample = sample.join(extra.loc[sample.index])
+            except Exception as e:
+                st.warning(f"Could not load {', '.join(missing_columns)}: {e}")
+        st.dataframe(decode_strings(sample), use_container_width=True)
         
         # Basic statistics
         st.write("**Dataset Statistics:**")
@@ -246,35 +736,118 @@ if df is not None:
         with col1:
             st.write("**Numerical Columns:**")
             if 'latitude' in filtered_df.columns:
-                st.write(filtered_df[['latitude', 'longitude']].describe())
+                if approximate:
+                    st.write(sketches.describe(sketch_state, sketch_brand))
+                    st.caption(f"Quartiles are within ±{sketches.bin_width / 2}° of the exact nearest-rank quartiles "
+                               "(exact mode interpolates between locations, which can differ by more "
+                               "when a selection has few locations).")
+                else:
+                    st.write(filtered_df[['latitude', 'longitude']].describe())
         
         with col2:
             st.write("**Categorical Columns:**")
-            st.write(f"• Total Brands: {filtered_df['name'].nunique()}")
-            st.write(f"• Total States: {filtered_df['province'].nunique()}")
-            st.write(f"• Total Records: {len(filtered_df)}")
+            if approximate:
+                st.write(f"• Total Brands: ~{sketches.distinct('name', sketch_state, sketch_brand)}")
+                st.write(f"• Total States: ~{sketches.distinct('province', sketch_state, sketch_brand)}")
+                if 'city' in sketches.distinct_columns:
+                    st.write(f"• Total Cities: ~{sketches.distinct('city', sketch_state, sketch_brand)}")
+                st.write(f"• Total Records: {sketches.count(sketch_state, sketch_brand)}")
+                st.caption(f"Distinct counts are HyperLogLog estimates (±{sketches.distinct_error:.1%} standard error).")
+            else:
+                st.write(f"• Total Brands: {filter_result.unique_brands}")
+                st.write(f"• Total States: {filter_result.states_covered}")
+                st.write(f"• Total Records: {filter_result.total}")
         
         # Brand frequency distribution
         st.subheader("Brand Frequency Distribution")
-        brand_counts = filtered_df['name'].value_counts()
+        brand_counts = filter_result.brand_counts[filter_result.brand_counts > 0]
         
         fig, ax = plt.subplots(figsize=(10, 6))
-        ax.hist(brand_counts.values, bins=20, alpha=0.7, color='steelblue')
+        ax.hist(brand_counts, bins=20, alpha=0.7, color='steelblue')
         ax.set_xlabel('Number of Locations')
         ax.set_ylabel('Number of Brands')
         ax.set_title('Distribution of Brand Frequencies')
         ax.grid(alpha=0.3)
-        plt.tight_layout()
+        fig.tight_layout()
         st.pyplot(fig)
+        plt.close(fig)
+        
+        # Rows whose province disagrees with their coordinates
+        if state_check is not None:
+            st.subheader("State Consistency")
+            checked = state_check.iloc[filtered_rows]
+            mismatches = filtered_df[checked['province_mismatch'].to_numpy()]
+            if STATE_BOUNDARIES:
+                st.write(f"**{len(mismatches)}** locations have coordinates that boundary polygons place in another state.")
+                found_in = 'Coordinates In'
+            else:
+                st.write(f"**{len(mismatches)}** locations are surrounded only by restaurants that report another "
+                         "state. They are flagged for review, not corrected: border towns and points outside "
+                         "the US can look the same without state boundaries (set FASTFOOD_STATE_BOUNDARIES).")
+                found_in = 'Neighbours In'
+            if len(mismatches):
+                columns = [c for c in ['name', 'address', 'city', 'province', 'latitude', 'longitude'] if c in mismatches.columns]
+                st.dataframe(decode_strings(mismatches[columns]).assign(
+                    **{found_in: state_check.loc[mismatches.index, 'geo_province']}), use_container_width=True)
+        
+        # Website domains of the brands and names that share one
+        domain_index = load_domain_index(df, fingerprint) if use_websites else None
+        if domain_index is not None:
+            st.subheader("Brand Websites")
+            if selected_brand != 'All':
+                brand_domains = domain_index.domains_of(selected_brand)
+                st.write(f"**Domains listed by {selected_brand} locations:** " +
+                         (", ".join(f"{domain} ({count})" for domain, count in brand_domains.head(5).items()) or "none"))
+            hints = domain_index.duplicate_hints()
+            st.write(f"**{len(hints)}** website domains are listed by more than one brand name "
+                     "(likely spellings of the same brand):")
+            st.dataframe(hints.head(20), use_container_width=True)
+        
+        # Export of the current filter result
+        st.subheader("Export Filtered Data")
+        export_format = st.selectbox("Export format:", list(EXPORT_FORMATS))
+        exporter, mime, extension = EXPORT_FORMATS[export_format]
+        
+        def export_filtered():
+            # Run on click only. Streamlit serves the download from memory, so
+            # the chunks are written straight into the one buffer it reads
+            output = io.BytesIO()
+            for chunk in exporter(df, filtered_rows):
+                output.write(chunk)
+            return output
+        
+        st.download_button(f"Download {len(filtered_rows):,} rows as {export_format.upper()}",
+                           data=export_filtered, file_name=f"fast_food_restaurants.{extension}",
+                           mime=mime, on_click='ignore')
+        
+        # Cache memory usage against the process-wide budget
+        with st.expander("Cache Memory"):
+            st.write(f"**Used:** {budget.used_bytes / 1024 ** 2:.1f} MB of "
+                     f"{budget.limit_bytes / 1024 ** 2:.0f} MB")
+            st.dataframe(budget.stats(), use_container_width=True, hide_index=True)
+            st.write(f"**Filter results:** {filter_cache.hits} hits, {filter_cache.misses} misses "
+                     f"({filter_cache.hit_rate:.0%} hit rate), {filter_cache.evictions} evictions")
+            st.dataframe(filter_cache.stats().head(10), use_container_width=True, hide_index=True)
+            if column_memory is not None:
+                st.write("**Dataset columns before and after string compaction:**")
+                st.dataframe(column_memory, use_container_width=True)
+        
+        # Deferred imports of this server process
+        with st.expander("Startup Imports"):
+            st.dataframe(import_report(), use_container_width=True, hide_index=True)
+            st.caption("Plotting and model libraries imported on first use. "
+                       "Run `python lazyimports.py` for the cold-start import times of a fresh process.")
     
     # Insights Section
     st.header("🔍 Key Insights")
     
-    # Calculate insights dynamically
-    top_brand = df['name'].value_counts().index[0]
-    top_state = df['province'].value_counts().index[0]
-    total_brands = df['name'].nunique()
-    total_states = df['province'].nunique()
+    # Calculate insights dynamically from the unfiltered counts (cached
+    # with the filter results, so reruns do not count the dataset again)
+    national = filter_cache.get(FilterCache.key('All', 'All', 'All', 'All'), lambda: np.arange(len(df)))
+    top_brand = national.top_brands(1).index[0]
+    top_state = national.top_states(1).index[0]
+    total_brands = national.unique_brands
+    total_states = national.states_covered
     
     col1, col2, col3 = st.columns(3)
     
@@ -300,14 +873,24 @@ if df is not None:
     
     with col3:
         st.subheader("Market Structure")
+        brand_classes = load_brand_classes(df, fingerprint, use_websites)
+        class_share = brand_classes.groupby('Class')['Locations'].sum() / brand_classes['Locations'].sum() * 100
+        national_hhi = 10_000 * ((brand_classes['Locations'] / brand_classes['Locations'].sum()) ** 2).sum()
+        state_concentration = concentration(load_preferences(df, fingerprint).counts, load_preferences(df, fingerprint).states)
+        state_concentration = state_concentration[state_concentration['Restaurants'] >= 20]
         st.write(f"""
-        The fast food market shows both **national consolidation** and 
-        **regional variation**.
+        **{class_share.get('National Chain', 0):.0f}%** of locations belong to
+        {(brand_classes['Class'] == 'National Chain').sum()} national chains; regional
+        chains hold {class_share.get('Regional Chain', 0):.0f}% and independents
+        {class_share.get('Independent', 0):.0f}%.
         
-        While major chains dominate nationally, different states show 
-        varying preferences, suggesting regional tastes and local 
-        competition influence market dynamics.
+        The national brand HHI is {national_hhi:.0f}.
         """)
+        if not state_concentration.empty:
+            st.write(f"""
+            By state (20+ restaurants) it ranges from {state_concentration['HHI'].min():.0f}
+            to {state_concentration['HHI'].max():.0f}, highest in {state_concentration.index[0]}.
+            """)
     
     # Footer
     st.markdown("---")
@@ -0,0 +1,257 @@
+"""Persistent precomputed aggregates shared by batch jobs and the dashboard.
+
+A batch run computes the aggregates and indexes the dashboard would
+otherwise build at startup and writes them under
+``<directory>/<fingerprint>/``, where the fingerprint is a hash of the
+source file's raw bytes (see loader.py), known without parsing it:
+
+* ``counts_*``: the state x brand location count cube (sparse triplets),
+* ``geo_state`` / ``state_mismatch``: the coordinate-derived state of every
+  row and its mismatch flag (see geocheck.py),
+* ``clusters``: DBSCAN cluster labels at the default settings (see
+  clusters.py),
+* ``store.*``, ``sampler.*``, ``hierarchy.*``, ``sketches.*``: the arrays of
+  the record store, the level-of-detail sampler, the drill-down index and
+  the approximate statistics sketches,
+* ``domains.*``: the brand <-> website domain table (see domains.py), when
+  the build is given the ``websites`` column, so the dashboard does not
+  read it from the source.
+
+Arrays are plain ``.npy`` files that readers memory-map read-only; labels
+and parameters live in ``manifest.json``. A dataset that was already
+processed with the current ``ARTIFACT_VERSION`` is skipped, so the batch
+command only does work for new data.
+
+Run with:  python artifacts.py --data FastFoodRestaurants.csv --output artifacts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from clusters import DEFAULT_EPS_KM, DEFAULT_MIN_SAMPLES, find_clusters
+from dataset import DASHBOARD_COLUMNS, read_restaurants
+from domains import DomainIndex
+from geocheck import check_states
+from hierarchy import GeoHierarchy
+from loader import source_fingerprint
+from restaurants import RestaurantStore
+from sampling import LevelOfDetailSampler
+from similarity import RegionalPreferences
+from sketches import SketchIndex
+
+# Bump when the contents or layout of the artifacts change
+ARTIFACT_VERSION = 2
+# Environment variable through which the dashboard finds the artifact directory
+ARTIFACTS_ENV = 'FASTFOOD_ARTIFACTS'
+# Environment variable with the fingerprint of a dataset loaded by serve.py
+FINGERPRINT_ENV = 'FASTFOOD_FINGERPRINT'
+MANIFEST = 'manifest.json'
+
+
+def dataset_fingerprint(df):
+    """Hash of the columns and values of ``df``, independent of string storage.
+
+    Converts strings to Python objects, so it is for spot checks of a few
+    columns; artifacts are keyed by ``loader.source_fingerprint``.
+    """
+    digest = hashlib.sha1()
+    for column in sorted(df.columns):
+        values = df[column]
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            # Object, Arrow and categorical strings hash alike
+            values = values.astype(object).where(values.notna(), None)
+        digest.update(column.encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class Artifacts:
+    """Read-only view of one dataset's artifacts."""
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            path = os.path.join(self.path, f"{name}.npy")
+            try:
+                self._arrays[name] = np.load(path, mmap_mode='r')
+            except ValueError:
+                # Empty arrays cannot be mapped
+                self._arrays[name] = np.load(path)
+        return self._arrays[name]
+
+    def section(self, section):
+        """The arrays a structure's ``arrays()`` returned, by name."""
+        labels = self.manifest['labels']
+        arrays = {}
+        for name in self.manifest['sections'][section]:
+            key = f"{section}.{name}"
+            arrays[name] = np.array(labels[key], dtype=object) if key in labels else self[key]
+        return arrays
+
+    def store(self):
+        return RestaurantStore.from_arrays(self.section('store'))
+
+    def sampler(self, store):
+        return LevelOfDetailSampler.from_arrays(store.longitude, store.latitude, self.section('sampler'))
+
+    def hierarchy(self):
+        return GeoHierarchy.from_arrays(self.section('hierarchy'))
+
+    def sketches(self):
+        return SketchIndex.from_arrays(self.section('sketches'))
+
+    def domain_index(self):
+        """Stored ``DomainIndex``, or ``None`` if built without websites."""
+        if 'domains' not in self.manifest['sections']:
+            return None
+        return DomainIndex.from_arrays(self.section('domains'))
+
+    def preferences(self):
+        """``RegionalPreferences`` rebuilt from the stored count cube."""
+        labels = self.manifest['labels']
+        return RegionalPreferences.from_counts(
+            labels['states'], labels['brands'],
+            (self['counts_data'], (self['counts_row'], self['counts_col'])))
+
+    def state_check(self, index):
+        """The ``check_states`` frame for rows with the given ``index``."""
+        geo_states = np.array(self.manifest['labels']['geo_states'] + [None], dtype=object)
+        return pd.DataFrame({
+            'geo_province': pd.Series(geo_states[self['geo_state']], index=index, dtype=object),
+            'province_mismatch': np.asarray(self['state_mismatch']),
+        }, index=index)
+
+    def clusters(self, eps_km, min_samples):
+        """Stored cluster labels if they were computed with these settings."""
+        parameters = self.manifest['parameters']['clusters']
+        if parameters != {'eps_km': eps_km, 'min_samples': min_samples}:
+            return None
+        return np.asarray(self['clusters'])
+
+
+class ArtifactStore:
+    """Directory of artifact sets, one per dataset fingerprint."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, fingerprint):
+        return os.path.join(self.directory, fingerprint)
+
+    def load(self, fingerprint):
+        """Artifacts of ``fingerprint``, or ``None`` if missing or outdated."""
+        try:
+            with open(os.path.join(self._path(fingerprint), MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != ARTIFACT_VERSION:
+            return None
+        return Artifacts(self._path(fingerprint), manifest)
+
+    def build(self, df, fingerprint, websites=None, force=False):
+        """Compute and write the artifacts of ``df`` unless they are current.
+
+        ``fingerprint`` is the ``source_fingerprint`` of the file ``df`` was
+        read from, and ``websites`` its ``websites`` column, if available.
+        """
+        existing = self.load(fingerprint)
+        if existing is not None and not force:
+            return existing
+        start = time.perf_counter()
+        arrays = {}
+
+        preferences = RegionalPreferences(df)
+        counts = preferences.counts.tocoo()
+        arrays['counts_row'] = counts.row.astype(np.int32)
+        arrays['counts_col'] = counts.col.astype(np.int32)
+        arrays['counts_data'] = counts.data.astype(np.int32)
+
+        check = check_states(df)
+        geo_codes, geo_states = pd.factorize(check['geo_province'])
+        # Missing (-1) points at the trailing None label
+        arrays['geo_state'] = np.where(geo_codes < 0, len(geo_states), geo_codes).astype(np.int32)
+        arrays['state_mismatch'] = check['province_mismatch'].to_numpy()
+
+        arrays['clusters'] = find_clusters(df['longitude'], df['latitude'], DEFAULT_EPS_KM, DEFAULT_MIN_SAMPLES)
+
+        store = RestaurantStore.from_frame(df)
+        sections = {
+            'store': store.arrays(),
+            'sampler': LevelOfDetailSampler(store.longitude, store.latitude).arrays(),
+            'hierarchy': GeoHierarchy(df).arrays(),
+            'sketches': SketchIndex(df).arrays(),
+        }
+        if websites is not None:
+            sections['domains'] = DomainIndex.from_frame(df['name'], websites).arrays()
+        # Object arrays (labels) go to the manifest, the rest to .npy files
+        section_labels = {}
+        for section, section_arrays in sections.items():
+            for name, array in section_arrays.items():
+                if array.dtype == object:
+                    section_labels[f"{section}.{name}"] = [None if pd.isna(v) else str(v) for v in array]
+                else:
+                    arrays[f"{section}.{name}"] = array
+
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'fingerprint': fingerprint,
+            'rows': len(df),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'labels': {
+                'states': [str(s) for s in preferences.states],
+                'brands': [str(b) for b in preferences.brands],
+                'geo_states': [str(s) for s in geo_states],
+                **section_labels,
+            },
+            'sections': {section: list(section_arrays) for section, section_arrays in sections.items()},
+            'parameters': {'clusters': {'eps_km': DEFAULT_EPS_KM, 'min_samples': DEFAULT_MIN_SAMPLES}},
+            'build_seconds': None,
+        }
+
+        # Write to a temporary directory and rename it into place, so readers
+        # never see a half-written set
+        path = self._path(fingerprint)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        manifest['build_seconds'] = round(time.perf_counter() - start, 3)
+        with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return self.load(fingerprint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the dashboard aggregates for a dataset.")
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'FastFoodRestaurants.csv'),
+                        help="path or URL of FastFoodRestaurants.csv")
+    parser.add_argument('--output', default='artifacts', help="artifact directory")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the artifacts are current")
+    args = parser.parse_args()
+
+    df = read_restaurants(args.data, [*DASHBOARD_COLUMNS, 'websites'])
+    artifacts = ArtifactStore(args.output).build(df[DASHBOARD_COLUMNS], source_fingerprint(args.data),
+                                                 websites=df['websites'], force=args.force)
+    manifest = artifacts.manifest
+    print(f"Artifacts for {manifest['rows']} rows in {artifacts.path} "
+          f"(built {manifest['created']} in {manifest['build_seconds']}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Population within a radius of each restaurant.
+
+Population comes from a table of weighted points, typically census block
+or tract centroids (a CSV with ``latitude``, ``longitude`` and
+``population`` columns); none ships with the dataset. The points are
+binned into a regular raster, and each raster row is stored as a running
+sum, so the population of any horizontal run of cells is one subtraction.
+A catchment disk is then a few runs, one per raster row it crosses, and
+every run is computed for all locations at once.
+
+The raster only resolves disks several cells wide: a 1 km disk around a
+location that falls between cell centres of a 2.8 km raster holds no
+centre at all. Radii under ``MIN_CELLS_PER_RADIUS`` cells are summed from
+the population points themselves instead, through a k-d tree.
+"""
+
+import numpy as np
+import pandas as pd
+
+from geocheck import unit_vectors
+from lazyimports import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_CELL_DEGREES = 0.025
+# Smallest radius, in raster cells, answered from the raster
+MIN_CELLS_PER_RADIUS = 4
+
+
+class PopulationGrid:
+    """Population raster with per-row prefix sums."""
+
+    def __init__(self, longitude, latitude, population, cell_degrees=DEFAULT_CELL_DEGREES):
+        longitude = np.asarray(longitude, dtype=np.float64)
+        latitude = np.asarray(latitude, dtype=np.float64)
+        population = np.asarray(population, dtype=np.float64)
+        keep = ~(np.isnan(longitude) | np.isnan(latitude) | np.isnan(population))
+        longitude, latitude, population = longitude[keep], latitude[keep], population[keep]
+        self.cell_degrees = cell_degrees
+        self.lon0 = np.floor(longitude.min() / cell_degrees) * cell_degrees
+        self.lat0 = np.floor(latitude.min() / cell_degrees) * cell_degrees
+        ix = ((longitude - self.lon0) / cell_degrees).astype(np.int64)
+        iy = ((latitude - self.lat0) / cell_degrees).astype(np.int64)
+        self.shape = (iy.max() + 1, ix.max() + 1)
+        grid = np.bincount(iy * self.shape[1] + ix, weights=population,
+                           minlength=self.shape[0] * self.shape[1]).reshape(self.shape)
+        self.row_sums = np.zeros((self.shape[0], self.shape[1] + 1))
+        np.cumsum(grid, axis=1, out=self.row_sums[:, 1:])
+        self.total = population.sum()
+        # The points, for radii too small for the raster
+        self.longitude, self.latitude, self.population = longitude, latitude, population
+        self._tree = None
+
+    @classmethod
+    def from_csv(cls, path, cell_degrees=DEFAULT_CELL_DEGREES):
+        points = pd.read_csv(path, usecols=['latitude', 'longitude', 'population'])
+        return cls(points['longitude'], points['latitude'], points['population'], cell_degrees)
+
+    def catchment(self, longitude, latitude, radius_km):
+        """Population within ``radius_km`` of each point.
+
+        Small radii sum the population points within the radius; larger ones
+        the raster cells whose centres lie within it, where parts of a disk
+        outside the raster count as unpopulated. Points without coordinates
+        get NaN.
+        """
+        longitude = np.asarray(longitude, dtype=np.float64)
+        latitude = np.asarray(latitude, dtype=np.float64)
+        cell_km = self.cell_degrees * KM_PER_DEGREE
+        if radius_km < MIN_CELLS_PER_RADIUS * cell_km:
+            return self._point_catchment(longitude, latitude, radius_km)
+        x = (longitude - self.lon0) / self.cell_degrees
+        y = (latitude - self.lat0) / self.cell_degrees
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = np.where(valid, x, 0), np.where(valid, y, 0)
+        # Cells per km along a raster row shrink with the cosine of the latitude
+        column_km = cell_km * np.maximum(np.cos(np.radians(np.where(valid, latitude, 0))), 1e-6)
+        base = np.floor(y).astype(np.int64)
+        reach = int(np.ceil(radius_km / cell_km)) + 1
+        total = np.zeros(len(x))
+        for offset in range(-reach, reach + 1):
+            row = base + offset
+            dy_km = (row + 0.5 - y) * cell_km
+            half = np.sqrt(np.clip(radius_km ** 2 - dy_km ** 2, 0, None)) / column_km
+            lo = np.clip(np.ceil(x - half - 0.5).astype(np.int64), 0, self.shape[1])
+            hi = np.clip(np.floor(x + half - 0.5).astype(np.int64) + 1, 0, self.shape[1])
+            inside = valid & (row >= 0) & (row < self.shape[0]) & (hi > lo) & (np.abs(dy_km) <= radius_km)
+            r = row[inside]
+            total[inside] += self.row_sums[r, hi[inside]] - self.row_sums[r, lo[inside]]
+        total[~valid] = np.nan
+        return total
+
+    def _point_catchment(self, longitude, latitude, radius_km):
+        if self._tree is None:
+            self._tree = spatial.cKDTree(unit_vectors(self.longitude, self.latitude))
+        valid = ~(np.isnan(longitude) | np.isnan(latitude))
+        total = np.full(len(longitude), np.nan)
+        locations = spatial.cKDTree(unit_vectors(longitude[valid], latitude[valid]))
+        # Great-circle radius as a chord of the unit sphere
+        chord = 2 * np.sin(radius_km / (2 * EARTH_RADIUS_KM))
+        pairs = locations.sparse_distance_matrix(self._tree, chord, output_type='ndarray')
+        total[valid] = np.bincount(pairs['i'], weights=self.population[pairs['j']], minlength=int(valid.sum()))
+        return total
+
+
+def catchment_summary(df, population, column):
+    """Locations and catchment population per value of ``column``.
+
+    Overlapping catchments of the same group are all counted, so ``Total``
+    is people-served summed over locations, not distinct residents.
+    """
+    frame = pd.DataFrame({column: df[column].to_numpy(), 'population': population})
+    summary = frame.groupby(column)['population'].agg(['size', 'sum', 'mean', 'median'])
+    summary.columns = ['Locations', 'Total Catchment', 'Mean Catchment', 'Median Catchment']
+    return summary.round(0).sort_values('Mean Catchment', ascending=False)
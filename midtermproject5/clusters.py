@@ -0,0 +1,61 @@
+"""Dense clusters of restaurants (city centres, strip-mall corridors).
+
+DBSCAN on the haversine distance between locations. Neighbourhoods come
+from a ball tree, so each radius query is O(log n) and no pairwise
+distance matrix is ever built.
+"""
+
+import numpy as np
+import pandas as pd
+
+from lazyimports import lazy_import
+
+cluster = lazy_import('sklearn.cluster')
+
+EARTH_RADIUS_KM = 6371.0088
+# Settings the dashboard opens with (and the batch precompute uses)
+DEFAULT_EPS_KM = 2.0
+DEFAULT_MIN_SAMPLES = 8
+
+
+def find_clusters(longitude, latitude, eps_km=DEFAULT_EPS_KM, min_samples=DEFAULT_MIN_SAMPLES):
+    """DBSCAN cluster label per location; -1 is noise or missing coordinates."""
+    longitude = np.asarray(longitude, dtype=np.float64)
+    latitude = np.asarray(latitude, dtype=np.float64)
+    labels = np.full(len(longitude), -1, dtype=np.int64)
+    valid = np.flatnonzero(~(np.isnan(longitude) | np.isnan(latitude)))
+    if len(valid) < min_samples:
+        return labels
+    # haversine expects (latitude, longitude) in radians
+    points = np.radians(np.column_stack([latitude[valid], longitude[valid]]))
+    model = cluster.DBSCAN(eps=eps_km / EARTH_RADIUS_KM, min_samples=min_samples,
+                           metric='haversine', algorithm='ball_tree', n_jobs=-1)
+    labels[valid] = model.fit_predict(points)
+    return labels
+
+
+def cluster_summary(df, labels, n_brands=3):
+    """Size, centre and brand mix of every cluster present in ``df``.
+
+    ``labels`` are the cluster labels of the rows of ``df``; noise is left out.
+    """
+    clustered = labels >= 0
+    frame = pd.DataFrame({
+        'cluster': labels[clustered],
+        'name': df['name'].to_numpy(dtype=object)[clustered],
+        'latitude': df['latitude'].to_numpy(dtype=np.float64)[clustered],
+        'longitude': df['longitude'].to_numpy(dtype=np.float64)[clustered],
+    })
+    groups = frame.groupby('cluster')
+    summary = groups.agg(Restaurants=('name', 'size'), Brands=('name', 'nunique'),
+                         Latitude=('latitude', 'mean'), Longitude=('longitude', 'mean'))
+    brand_counts = frame.groupby(['cluster', 'name']).size().sort_values(ascending=False)
+    top = brand_counts.groupby(level='cluster').head(n_brands)
+    shares = (top / summary['Restaurants'].reindex(top.index.get_level_values('cluster')).to_numpy() * 100).round(0)
+    summary['Brand Mix'] = shares.groupby(level='cluster').apply(
+        lambda s: ', '.join(f"{brand} {share:.0f}%" for (_, brand), share in s.items()))
+    if 'city' in df.columns:
+        cities = pd.Series(df['city'].to_numpy(dtype=object)[clustered], index=frame.index)
+        summary.insert(0, 'City', cities.groupby(frame['cluster']).agg(lambda c: c.mode().iat[0] if c.notna().any() else None))
+    summary[['Latitude', 'Longitude']] = summary[['Latitude', 'Longitude']].round(3)
+    return summary.sort_values('Restaurants', ascending=False)
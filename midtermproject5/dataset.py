@@ -0,0 +1,68 @@
+"""Reading the FastFoodRestaurants.csv dataset."""
+
+import pandas as pd
+
+# Columns the dashboard views and the API read
+DASHBOARD_COLUMNS = ['address', 'city', 'country', 'latitude', 'longitude', 'name', 'postalCode', 'province']
+# Long strings no default view uses; loaded on demand only
+LAZY_COLUMNS = ['websites', 'keys']
+# String columns with many repeated values, stored as categoricals
+DICTIONARY_COLUMNS = ['city', 'country', 'name', 'postalCode', 'province']
+
+
+def read_restaurants(source, columns=None):
+    """Read ``columns`` (all when ``None``) from a CSV path or URL.
+
+    The pyarrow engine parses the file on all cores, and columns left out of
+    ``usecols`` are skipped by the parser instead of being read and dropped.
+    """
+    df = pd.read_csv(source, engine='pyarrow', usecols=columns, dtype={'postalCode': 'str'})
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def compact_strings(df, dictionary_columns=DICTIONARY_COLUMNS):
+    """Store the string columns of ``df`` compactly.
+
+    Columns in ``dictionary_columns`` become categoricals: each distinct
+    value is stored once and rows hold a small integer code. Unlike Arrow
+    dictionary arrays, categoricals still sort and support ``.str``. The
+    other string columns become Arrow strings (one contiguous buffer instead
+    of a Python object per row). Values are only decoded to Python strings
+    for the rows a view actually materializes.
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if (isinstance(series.dtype, (pd.ArrowDtype, pd.CategoricalDtype))
+                or not pd.api.types.is_string_dtype(series.dtype)):
+            continue
+        if column in dictionary_columns:
+            columns[column] = series.astype('category')
+        elif series.dtype == object:
+            columns[column] = series.astype(pd.StringDtype('pyarrow'))
+    return df.assign(**columns)
+
+
+def decode_strings(df):
+    """Copy of ``df`` with the categorical columns decoded to plain strings.
+
+    Meant for the few rows a view displays, not for the whole dataset.
+    """
+    columns = {
+        column: df[column].astype(pd.StringDtype('pyarrow'))
+        for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+    return df.assign(**columns)
+
+
+def memory_report(before, after):
+    """Per-column memory of two versions of a frame, in KB."""
+    report = pd.DataFrame({
+        'Storage': after.dtypes.map(str),
+        'Before (KB)': before.memory_usage(deep=True, index=False) / 1024,
+        'After (KB)': after.memory_usage(deep=True, index=False) / 1024,
+    })
+    report.loc['Total'] = ['', report['Before (KB)'].sum(), report['After (KB)'].sum()]
+    report['Saved (%)'] = 100 * (1 - report['After (KB)'] / report['Before (KB)'])
+    return report.round(1)
@@ -0,0 +1,131 @@
+"""Website domains of the brands, from the ``websites`` column.
+
+Each ``websites`` value is a comma-separated list of URLs. All of them are
+split, reduced to their registered domain (``http://locations.whataburger.com/tx``
+becomes ``whataburger.com``) and deduplicated per row with Arrow compute
+kernels, so no URL is parsed in Python. The result is a table of
+(brand code, domain code, location count) triples kept sorted both ways,
+for lookups from a brand to its domains and from a domain to the brands
+that list it. Several brand names listing the same domain are usually
+spellings of one brand ("McDonald's" / "Mcdonald's"), which makes the
+domain a dedup hint.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Host of a URL with or without scheme, up to the port, path, query or fragment
+HOST_PATTERN = r'^\s*(?:[A-Za-z][A-Za-z0-9+.-]*://)?(?:[^@/?#]*@)?(?P<host>[^/?#:\s]+)'
+# Last two labels, or three under a country-code second level (example.co.uk)
+DOMAIN_PATTERN = r'(?P<domain>[^.]+\.(?:(?:co|com|org|net|gov|edu|ac)\.[a-z]{2}|[a-z0-9-]+))\.?$'
+
+
+def url_domains(urls):
+    """Registered domain of each URL in an Arrow string array (null if none)."""
+    hosts = pc.struct_field(pc.extract_regex(urls, HOST_PATTERN), [0])
+    return pc.struct_field(pc.extract_regex(pc.utf8_lower(hosts), DOMAIN_PATTERN), [0])
+
+
+class DomainIndex:
+    """Brand <-> domain table stored as integer codes."""
+
+    def __init__(self, brands, domains, brand_codes, domain_codes, counts):
+        self.brands = pd.Index(brands)
+        self.domains = pd.Index(domains)
+        order = np.lexsort((domain_codes, brand_codes))
+        self.brand_codes = brand_codes[order]
+        self.domain_codes = domain_codes[order]
+        self.counts = counts[order]
+        # The same triples sorted by domain, for the reverse lookup
+        self._by_domain = np.lexsort((self.brand_codes, self.domain_codes))
+
+    @classmethod
+    def from_frame(cls, names, websites):
+        """Build from aligned brand name and ``websites`` columns."""
+        brand_codes, brands = pd.factorize(names, sort=True)
+        lists = pc.split_pattern(pa.Array.from_pandas(websites), ',')
+        rows = pc.list_parent_indices(lists).to_numpy()
+        domains = url_domains(pc.list_flatten(lists))
+        domain_codes, domain_labels = pd.factorize(pd.Series(domains.to_pandas()), sort=True)
+
+        valid = (domain_codes >= 0) & (brand_codes[rows] >= 0)
+        rows, domain_codes = rows[valid], domain_codes[valid]
+        # A row listing one domain several times counts once
+        row_pairs = np.unique(rows.astype(np.int64) * len(domain_labels) + domain_codes)
+        pair_brands = brand_codes[row_pairs // len(domain_labels)]
+        pairs, counts = np.unique(pair_brands.astype(np.int64) * len(domain_labels)
+                                  + row_pairs % len(domain_labels), return_counts=True)
+        return cls(np.asarray(brands, dtype=object), np.asarray(domain_labels, dtype=object),
+                   (pairs // len(domain_labels)).astype(np.int32),
+                   (pairs % len(domain_labels)).astype(np.int32), counts)
+
+    def arrays(self):
+        """The table as a flat dict of arrays, for ``from_arrays``."""
+        return {
+            'brands': np.asarray(self.brands, dtype=object),
+            'domains': np.asarray(self.domains, dtype=object),
+            'brand_codes': self.brand_codes,
+            'domain_codes': self.domain_codes,
+            'counts': self.counts,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Index over the arrays of ``arrays()``."""
+        return cls(arrays['brands'], arrays['domains'], arrays['brand_codes'],
+                   arrays['domain_codes'], arrays['counts'])
+
+    def _frame(self, codes, labels, counts, name):
+        frame = pd.Series(counts, index=pd.Index(labels[codes], name=name), name='Locations')
+        return frame.sort_values(ascending=False, kind='stable')
+
+    def domains_of(self, brand):
+        """Domains listed by ``brand``'s locations with their location counts."""
+        if brand not in self.brands:
+            return self._frame(np.empty(0, dtype=np.int32), self.domains, np.empty(0, dtype=np.int64), 'Domain')
+        code = self.brands.get_loc(brand)
+        lo, hi = np.searchsorted(self.brand_codes, [code, code + 1])
+        return self._frame(self.domain_codes[lo:hi], self.domains, self.counts[lo:hi], 'Domain')
+
+    def brands_of(self, domain):
+        """Brands whose locations list ``domain``, with their location counts."""
+        if domain not in self.domains:
+            return self._frame(np.empty(0, dtype=np.int32), self.brands, np.empty(0, dtype=np.int64), 'Brand')
+        code = self.domains.get_loc(domain)
+        sorted_domains = self.domain_codes[self._by_domain]
+        lo, hi = np.searchsorted(sorted_domains, [code, code + 1])
+        rows = self._by_domain[lo:hi]
+        return self._frame(self.brand_codes[rows], self.brands, self.counts[rows], 'Brand')
+
+    def top_domains(self):
+        """Each brand's most listed domain and its location count."""
+        first = np.lexsort((-self.counts, self.brand_codes))
+        first = first[np.r_[True, self.brand_codes[first][1:] != self.brand_codes[first][:-1]]]
+        return pd.DataFrame({
+            'Domain': self.domains[self.domain_codes[first]],
+            'Domain Locations': self.counts[first],
+        }, index=self.brands[self.brand_codes[first]])
+
+    def duplicate_hints(self, min_locations=2, max_brands=8):
+        """Domains listed by several brand names: likely spellings of one brand.
+
+        Only (brand, domain) pairs with at least ``min_locations`` locations
+        count, so a single mislabelled row does not link two brands. Domains
+        listed by more than ``max_brands`` names are directory or listing
+        sites (citygridmedia.com), not a brand's own site, and are left out.
+        """
+        keep = self.counts >= min_locations
+        domains, brands, counts = self.domain_codes[keep], self.brand_codes[keep], self.counts[keep]
+        n_brands = np.bincount(domains, minlength=len(self.domains))
+        shared = (n_brands[domains] > 1) & (n_brands[domains] <= max_brands)
+        frame = pd.DataFrame({
+            'Domain': self.domains[domains[shared]],
+            'Brand': self.brands[brands[shared]],
+            'Locations': counts[shared],
+        })
+        return (frame.sort_values('Locations', ascending=False)
+                .groupby('Domain', sort=False)
+                .agg(Brands=('Brand', ' / '.join), Locations=('Locations', 'sum'))
+                .sort_values('Locations', ascending=False))
@@ -0,0 +1,98 @@
+"""Streaming export of filtered restaurant rows.
+
+Each exporter takes the full frame and the row positions of a selection
+and yields the encoded output chunk by chunk, so only ``chunk_size`` rows
+are ever converted at a time, however large the selection.
+"""
+
+import io
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _chunks(rows, chunk_size):
+    if len(rows) == 0:
+        # Still produce one (empty) chunk so headers and schemas get written
+        yield rows
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def iter_csv(df, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    schema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+    for i, chunk in enumerate(_chunks(rows, chunk_size)):
+        buffer = io.BytesIO()
+        table = pa.Table.from_pandas(df.iloc[chunk], schema=schema, preserve_index=False)
+        pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=i == 0))
+        yield buffer.getvalue()
+
+
+def iter_geojson(df, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """GeoJSON FeatureCollection of points; rows without coordinates are skipped."""
+    properties = [c for c in df.columns if c not in ('latitude', 'longitude')]
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for chunk in _chunks(rows, chunk_size):
+        part = df.iloc[chunk]
+        part = part[part['latitude'].notna() & part['longitude'].notna()]
+        if part.empty:
+            continue
+        # pandas serializes the properties of the whole chunk at once; only
+        # the feature wrappers are formatted per row
+        records = part[properties].to_json(orient='records', lines=True).splitlines()
+        features = ','.join(
+            f'{{"type":"Feature","geometry":{{"type":"Point","coordinates":[{x!r},{y!r}]}},"properties":{p}}}'
+            for x, y, p in zip(part['longitude'].tolist(), part['latitude'].tolist(), records)
+        )
+        yield (features if first else ',' + features).encode('utf-8')
+        first = False
+    yield b']}'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back out instead of keeping them."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(df, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parquet file with one row group per chunk."""
+    sink = _ChunkSink()
+    schema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            writer.write_table(pa.Table.from_pandas(df.iloc[chunk], schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+# format -> (exporter, MIME type, file extension)
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'parquet': (iter_parquet, 'application/vnd.apache.parquet', 'parquet'),
+    'geojson': (iter_geojson, 'application/geo+json', 'geojson'),
+}
@@ -0,0 +1,145 @@
+"""Consistency check between each row's ``province`` and its coordinates.
+
+With state boundary polygons (a GeoJSON file, e.g. the Census Bureau
+cartographic boundaries converted to GeoJSON), every location is placed in
+its state by a vectorized even-odd point-in-polygon test. A 1-degree grid
+prefilters the candidates: a polygon is only tested against the points in
+the grid cells its bounding box covers.
+
+No boundaries ship with the dataset, so without a file the check falls
+back to the neighbours: a location is placed in the state most of its
+nearest restaurants report, if they agree strongly enough and none of
+them shares its own. This catches points dropped in the wrong state, but
+an isolated border town can still be flagged where the polygons would
+not, and a point across the national border takes the nearest US state.
+Its result is only good for flagging rows to review, never for
+rewriting their state.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from lazyimports import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+GRID_DEGREES = 1.0
+# Property names tried, in order, for the state code of a boundary feature
+STATE_PROPERTIES = ('STUSPS', 'postal', 'state_code', 'abbr', 'STATE', 'state')
+
+
+def _cells(lon, lat):
+    return np.floor(lon / GRID_DEGREES).astype(np.int64) * 1000 + np.floor(lat / GRID_DEGREES).astype(np.int64)
+
+
+class StateBoundaries:
+    """State polygons with a grid index over their bounding boxes."""
+
+    def __init__(self, polygons):
+        # polygons: list of (state, [ring, ...]); each ring an (n, 2) lon/lat array
+        self.states = []
+        self.edges = []
+        self.cells = []
+        for state, rings in polygons:
+            start = np.concatenate([r for r in rings])
+            end = np.concatenate([np.roll(r, -1, axis=0) for r in rings])
+            lo, hi = start.min(axis=0), start.max(axis=0)
+            x = np.arange(np.floor(lo[0] / GRID_DEGREES), np.floor(hi[0] / GRID_DEGREES) + 1)
+            y = np.arange(np.floor(lo[1] / GRID_DEGREES), np.floor(hi[1] / GRID_DEGREES) + 1)
+            self.states.append(state)
+            self.edges.append((start, end))
+            self.cells.append((x[:, None] * 1000 + y[None, :]).astype(np.int64).ravel())
+
+    @classmethod
+    def from_geojson(cls, path):
+        with open(path) as f:
+            features = json.load(f)['features']
+        polygons = []
+        for feature in features:
+            properties = feature.get('properties') or {}
+            state = next((properties[p] for p in STATE_PROPERTIES if properties.get(p)), None)
+            geometry = feature.get('geometry') or {}
+            if state is None or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+                continue
+            parts = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            for part in parts:
+                # Holes are rings too; even-odd counting subtracts them
+                polygons.append((state, [np.asarray(ring, dtype=np.float64)[:, :2] for ring in part]))
+        return cls(polygons)
+
+    @staticmethod
+    def _inside(points, start, end, chunk_size=2048):
+        inside = np.zeros(len(points), dtype=bool)
+        for i in range(0, len(points), chunk_size):
+            x = points[i:i + chunk_size, 0:1]
+            y = points[i:i + chunk_size, 1:2]
+            crosses = (start[:, 1] > y) != (end[:, 1] > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+            inside[i:i + chunk_size] = (np.count_nonzero(crosses & (x < x_cross), axis=1) % 2) == 1
+        return inside
+
+    def locate(self, longitude, latitude):
+        """State containing each point (``None`` outside every polygon)."""
+        longitude = np.asarray(longitude, dtype=np.float64)
+        latitude = np.asarray(latitude, dtype=np.float64)
+        result = np.full(len(longitude), None, dtype=object)
+        valid = ~(np.isnan(longitude) | np.isnan(latitude))
+        cells = np.where(valid, _cells(np.nan_to_num(longitude), np.nan_to_num(latitude)), -1)
+        points = np.column_stack([longitude, latitude])
+        for state, (start, end), polygon_cells in zip(self.states, self.edges, self.cells):
+            candidates = np.flatnonzero(valid & np.isin(cells, polygon_cells) & (result == None))  # noqa: E711
+            if len(candidates):
+                result[candidates[self._inside(points[candidates], start, end)]] = state
+        return result
+
+
+def unit_vectors(longitude, latitude):
+    """Points on the unit sphere; chord distance grows with great-circle distance."""
+    lon, lat = np.radians(longitude), np.radians(latitude)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def neighbour_states(df, k=10, agreement=0.8):
+    """State most of each location's ``k`` nearest restaurants report.
+
+    A row only takes another state when none of its neighbours share its own
+    ``province`` and at least ``agreement`` of them agree on one state; this
+    keeps border towns, whose neighbours straddle the line, as they are.
+    """
+    result = df['province'].to_numpy(dtype=object).copy()
+    coords = df[['longitude', 'latitude']].to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(coords).any(axis=1) & df['province'].notna().to_numpy())
+    result[np.isnan(coords).any(axis=1)] = None
+    k = min(k, len(valid) - 1)
+    if k < 1:
+        return result
+    codes, states = pd.factorize(df['province'].to_numpy()[valid])
+    tree = spatial.cKDTree(unit_vectors(coords[valid, 0], coords[valid, 1]))
+    # The nearest point is the location itself
+    _, neighbours = tree.query(tree.data, k=k + 1)
+    votes = codes[neighbours[:, 1:]]
+    # Support of each neighbour's vote, one column at a time to stay O(n * k)
+    support = np.column_stack([(votes == votes[:, [j]]).sum(axis=1) for j in range(k)])
+    best = support.argmax(axis=1)
+    majority = votes[np.arange(len(valid)), best]
+    agreed = (support[np.arange(len(valid)), best] >= agreement * k) & ~(votes == codes[:, None]).any(axis=1)
+    result[valid[agreed]] = states[majority[agreed]]
+    return result
+
+
+def check_states(df, boundaries=None):
+    """Frame with the coordinate-derived state and a mismatch flag per row.
+
+    ``geo_province`` is ``None`` where the coordinates are missing or fall
+    outside every boundary polygon; such rows are never flagged.
+    """
+    if boundaries is not None:
+        geo = boundaries.locate(df['longitude'], df['latitude'])
+    else:
+        geo = neighbour_states(df)
+    geo = pd.Series(geo, index=df.index, name='geo_province')
+    mismatch = geo.notna() & df['province'].notna() & (geo != df['province'])
+    return pd.DataFrame({'geo_province': geo, 'province_mismatch': mismatch})
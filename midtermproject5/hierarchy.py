@@ -0,0 +1,184 @@
+"""State -> city -> postal code drill-down index.
+
+Rows are sorted once by (state, city, postal code), so every node of the
+hierarchy owns a contiguous slice of the sorted order and the children of
+a node are a contiguous run of nodes on the next level. Rollups (location
+count, unique brands, top brand) are precomputed for every node, so
+expanding a node only reads its children instead of rescanning the data.
+Counts of a single brand per child come from the sorted positions of that
+brand's rows, two binary searches per child.
+"""
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ('province', 'city', 'postalCode')
+# Numeric node columns, stored as they are by ``arrays()``
+NODE_COUNTS = ('Restaurants', 'Unique Brands', 'Top Brand Locations', 'start', 'end')
+
+
+class GeoHierarchy:
+    """Multi-level index over the location columns with per-node rollups."""
+
+    def __init__(self, df, levels=LEVELS):
+        self.levels = [c for c in levels if c in df.columns]
+        codes, self.labels = [], []
+        for column in self.levels:
+            level_codes, uniques = pd.factorize(df[column].astype('string').fillna('Unknown'), sort=True)
+            codes.append(level_codes)
+            self.labels.append(np.asarray(uniques, dtype=object))
+        brand_codes, self.brands = pd.factorize(df['name'], sort=True)
+        self._brand_index = pd.Index(self.brands)
+
+        # Prefix-sorted row order: state, then city, then postal code
+        self.order = np.lexsort(codes[::-1]) if codes else np.arange(len(df))
+        sorted_codes = [c[self.order] for c in codes]
+        sorted_brands = brand_codes[self.order]
+        # Sorted positions of every brand's rows, grouped by brand
+        self._brand_positions = np.argsort(sorted_brands, kind='stable')
+        self._brand_starts = np.searchsorted(sorted_brands[self._brand_positions],
+                                             np.arange(len(self.brands) + 1))
+
+        self.nodes = []
+        changed = np.zeros(len(df), dtype=bool)
+        if len(df):
+            changed[0] = True
+        for depth, level_codes in enumerate(sorted_codes):
+            changed[1:] |= level_codes[1:] != level_codes[:-1]
+            starts = np.flatnonzero(changed)
+            ends = np.append(starts[1:], len(df))
+            node_ids = np.cumsum(changed) - 1
+            nodes = pd.DataFrame({
+                column: self.labels[i][sorted_codes[i][starts]]
+                for i, column in enumerate(self.levels[:depth + 1])
+            })
+            nodes['Restaurants'] = ends - starts
+            nodes = nodes.join(self._brand_rollup(node_ids, sorted_brands, len(starts)))
+            nodes['start'], nodes['end'] = starts, ends
+            self.nodes.append(nodes)
+        self._index_nodes()
+
+    def _index_nodes(self):
+        # Start of every node per level, and (label, ...) -> node position
+        self.starts, self._lookup = [], []
+        for depth, nodes in enumerate(self.nodes):
+            self.starts.append(nodes['start'].to_numpy())
+            keys = zip(*(nodes[c] for c in self.levels[:depth + 1]))
+            self._lookup.append({key: i for i, key in enumerate(keys)})
+
+    def arrays(self):
+        """The index as a flat dict of arrays, for ``from_arrays``.
+
+        Labels (level names, level values, brands) are object arrays; node
+        labels and top brands are stored as codes into them.
+        """
+        brands = np.asarray(self.brands, dtype=object)
+        arrays = {
+            'levels': np.array(self.levels, dtype=object),
+            'brands': brands,
+            'order': self.order,
+            'brand_positions': self._brand_positions,
+            'brand_starts': self._brand_starts,
+        }
+        for i, labels in enumerate(self.labels):
+            arrays[f"labels_{i}"] = labels
+        for depth, nodes in enumerate(self.nodes):
+            for i, column in enumerate(self.levels[:depth + 1]):
+                arrays[f"nodes_{depth}_{column}"] = pd.Index(self.labels[i]).get_indexer(nodes[column])
+            for column in NODE_COUNTS:
+                arrays[f"nodes_{depth}_{column}"] = nodes[column].to_numpy()
+            arrays[f"nodes_{depth}_Top Brand"] = pd.Index(brands).get_indexer(nodes['Top Brand'])
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Index over the arrays of ``arrays()``."""
+        hierarchy = cls.__new__(cls)
+        hierarchy.levels = list(arrays['levels'])
+        hierarchy.labels = [np.asarray(arrays[f"labels_{i}"], dtype=object) for i in range(len(hierarchy.levels))]
+        hierarchy.brands = np.asarray(arrays['brands'], dtype=object)
+        hierarchy._brand_index = pd.Index(hierarchy.brands)
+        hierarchy.order = arrays['order']
+        hierarchy._brand_positions = arrays['brand_positions']
+        hierarchy._brand_starts = arrays['brand_starts']
+        # Missing top brand (-1) points at a trailing None
+        top_brands = np.append(hierarchy.brands, None)
+        hierarchy.nodes = []
+        for depth in range(len(hierarchy.levels)):
+            nodes = pd.DataFrame({
+                column: hierarchy.labels[i][arrays[f"nodes_{depth}_{column}"]]
+                for i, column in enumerate(hierarchy.levels[:depth + 1])
+            })
+            nodes['Restaurants'] = arrays[f"nodes_{depth}_Restaurants"]
+            nodes['Unique Brands'] = arrays[f"nodes_{depth}_Unique Brands"]
+            nodes['Top Brand'] = top_brands[arrays[f"nodes_{depth}_Top Brand"]]
+            nodes['Top Brand Locations'] = arrays[f"nodes_{depth}_Top Brand Locations"]
+            nodes['start'] = arrays[f"nodes_{depth}_start"]
+            nodes['end'] = arrays[f"nodes_{depth}_end"]
+            hierarchy.nodes.append(nodes)
+        hierarchy._index_nodes()
+        return hierarchy
+
+    def _brand_rollup(self, node_ids, brand_codes, n_nodes):
+        # Count (node, brand) pairs once, then take the first (largest) brand per node
+        valid = brand_codes >= 0
+        pair_keys = node_ids[valid].astype(np.int64) * len(self.brands) + brand_codes[valid]
+        pairs, counts = np.unique(pair_keys, return_counts=True)
+        pair_nodes, pair_brands = np.divmod(pairs, len(self.brands))
+        unique_brands = np.bincount(pair_nodes, minlength=n_nodes)
+        ranked = np.lexsort((-counts, pair_nodes))
+        first = ranked[np.r_[True, pair_nodes[ranked][1:] != pair_nodes[ranked][:-1]]] if len(ranked) else ranked
+        top_brand = np.full(n_nodes, None, dtype=object)
+        top_count = np.zeros(n_nodes, dtype=np.int64)
+        top_brand[pair_nodes[first]] = np.asarray(self.brands, dtype=object)[pair_brands[first]]
+        top_count[pair_nodes[first]] = counts[first]
+        return pd.DataFrame({'Unique Brands': unique_brands, 'Top Brand': top_brand,
+                             'Top Brand Locations': top_count})
+
+    def _node(self, path):
+        depth = len(path) - 1
+        if depth < 0:
+            return -1, None
+        if depth >= len(self.levels):
+            raise KeyError(path)
+        return depth, self._lookup[depth][tuple(path)]
+
+    def children(self, path=()):
+        """Rollups of the children of ``path`` (``()`` for the states)."""
+        depth, index = self._node(path)
+        if depth + 1 >= len(self.levels):
+            return self.nodes[-1].iloc[0:0]
+        child_nodes, child_starts = self.nodes[depth + 1], self.starts[depth + 1]
+        if index is None:
+            return child_nodes
+        node = self.nodes[depth].iloc[index]
+        first, last = np.searchsorted(child_starts, [node['start'], node['end']])
+        return child_nodes.iloc[first:last]
+
+    def brand_children(self, path, brand):
+        """Location count of ``brand`` in every child of ``path`` that has one.
+
+        ``All Restaurants`` is the child's count over all brands and
+        ``Brand Share (%)`` the brand's share of it.
+        """
+        children = self.children(path)
+        if brand not in self._brand_index:
+            counts = np.zeros(len(children), dtype=np.int64)
+        else:
+            code = self._brand_index.get_loc(brand)
+            positions = self._brand_positions[self._brand_starts[code]:self._brand_starts[code + 1]]
+            counts = (np.searchsorted(positions, children['end'].to_numpy())
+                      - np.searchsorted(positions, children['start'].to_numpy()))
+        result = children[[c for c in self.levels if c in children.columns] + ['start', 'end']].copy()
+        result['Restaurants'] = counts
+        result['All Restaurants'] = children['Restaurants'].to_numpy()
+        result['Brand Share (%)'] = (100 * counts / np.maximum(result['All Restaurants'], 1)).round(1)
+        return result[counts > 0]
+
+    def rows(self, path):
+        """Row positions (into the original frame) under ``path``."""
+        depth, index = self._node(path)
+        if index is None:
+            return self.order
+        node = self.nodes[depth].iloc[index]
+        return self.order[node['start']:node['end']]
@@ -0,0 +1,121 @@
+"""Deferred imports of the heavy optional libraries, with their import times.
+
+seaborn (which pulls in scipy.stats), matplotlib.pyplot and scikit-learn
+take seconds to import in a fresh process, longer than the dashboard needs
+to show its loading progress and first metrics. Modules that only need
+them to draw a chart or run a model bind them with ``lazy_import`` instead,
+so the import happens on first attribute access, and every such import is
+timed for the startup report.
+
+Run with:  python lazyimports.py
+to print the per-package import times of a fresh interpreter importing the
+dashboard's modules (from ``python -X importtime``).
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+# Modules the dashboard imports at startup (see app.py)
+DASHBOARD_MODULES = [
+    'streamlit', 'pandas', 'numpy', 'artifacts', 'catchment', 'clusters', 'dataset', 'domains',
+    'export', 'geocheck', 'hierarchy', 'lazyimports', 'loader', 'marketstructure', 'memory',
+    'plotting', 'querycache', 'restaurants', 'sampling', 'shared_data', 'similarity',
+    'sketches', 'snapshots', 'topk',
+]
+
+_lock = threading.Lock()
+_import_times = {}  # module name -> (seconds, seconds after startup)
+# Imported by the dashboard's first script run, so close to server startup
+_process_start = time.perf_counter()
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    _import_times.setdefault(self._name, (time.perf_counter() - start,
+                                                          start - _process_start))
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name``, imported when one of its attributes is first used."""
+    return LazyModule(name)
+
+
+def import_report():
+    """Lazily imported modules with their import time, in import order.
+
+    A module that was already imported elsewhere shows close to zero.
+    """
+    with _lock:
+        times = dict(_import_times)
+    frame = pd.DataFrame([{'Module': name, 'Import (s)': round(seconds, 3), 'After Start (s)': round(at, 1)}
+                          for name, (seconds, at) in times.items()],
+                         columns=['Module', 'Import (s)', 'After Start (s)'])
+    return frame.sort_values('After Start (s)', ignore_index=True)
+
+
+def cold_import_times(modules, imports_lazy=()):
+    """Cumulative import time per top-level package in a fresh interpreter.
+
+    ``imports_lazy`` are imported as well, as they are on the first chart.
+    """
+    code = '\n'.join(f"import {name}" for name in [*modules, *imports_lazy])
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are indented by a single space
+        if len(name) - len(name.lstrip()) == 1:
+            rows.append({'Module': name.strip(), 'Import (s)': int(cumulative) / 1e6})
+    frame = pd.DataFrame(rows, columns=['Module', 'Import (s)'])
+    return frame.sort_values('Import (s)', ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the dashboard's cold-start import times.")
+    parser.add_argument('--with-charts', action='store_true',
+                        help="also import the lazily loaded plotting and model libraries")
+    parser.add_argument('--top', type=int, default=15, help="number of packages to list")
+    args = parser.parse_args()
+
+    lazy = (['matplotlib.pyplot', 'seaborn', 'sklearn.cluster', 'scipy.cluster.hierarchy', 'scipy.spatial']
+            if args.with_charts else [])
+    times = cold_import_times(DASHBOARD_MODULES, lazy)
+    print(times.head(args.top).to_string(index=False, float_format='{:.3f}'.format))
+    print(f"Total: {times['Import (s)'].sum():.2f}s")
+
+
+if __name__ == '__main__':
+    main()
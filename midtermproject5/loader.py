@@ -0,0 +1,181 @@
+"""Background loading of the dataset with progressive partial results.
+
+The CSV is fetched and parsed in a worker thread, one block at a time, with
+pyarrow's streaming reader. While it runs, the running aggregates (rows,
+brands, states, bytes read) can be read at any time to render the page
+progressively; the full frame is available once the last block is in.
+The raw bytes are hashed as they stream past, so the dataset's fingerprint
+(see artifacts.py) costs no second pass over the file.
+"""
+
+import collections
+import hashlib
+import os
+import threading
+import urllib.request
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+# Hex digits of the source fingerprint
+FINGERPRINT_LENGTH = 16
+
+
+def _open(source):
+    """Binary stream and its total size in bytes (``None`` when unknown)."""
+    if '://' in source:
+        response = urllib.request.urlopen(source)
+        return response, response.length
+    stream = open(source, 'rb')
+    return stream, os.fstat(stream.fileno()).st_size
+
+
+def source_fingerprint(source, block_size=1 << 20):
+    """Hash of the raw bytes of a CSV path or URL."""
+    stream, _ = _open(source)
+    digest = hashlib.sha1()
+    with stream:
+        while block := stream.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+class _CountingReader:
+    """File wrapper counting and hashing the bytes pulled through it."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_read = 0
+        self.digest = hashlib.sha1()
+        self.closed = False
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        self.digest.update(data)
+        return data
+
+    def close(self):
+        self.closed = True
+        self._stream.close()
+
+
+class BackgroundLoader:
+    """Reads ``columns`` of a CSV path or URL in a daemon thread."""
+
+    def __init__(self, source, columns=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.source = source
+        self.columns = columns
+        self.block_size = block_size
+        self.error = None
+        self.total_bytes = None
+        self.fingerprint = None
+        self.rows = 0
+        self.brand_counts = collections.Counter()
+        self.states = set()
+        self._reader = None
+        self._schema = None
+        self._batches = []
+        self._frame = None
+        self._taken = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='dataset-loader', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            stream, self.total_bytes = _open(self.source)
+            self._reader = _CountingReader(stream)
+            try:
+                reader = pa_csv.open_csv(
+                    self._reader,
+                    read_options=pa_csv.ReadOptions(block_size=self.block_size),
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=self.columns,
+                        column_types={'postalCode': pa.string()},
+                    ),
+                )
+                self._schema = reader.schema
+                for batch in reader:
+                    self._add(batch)
+                # Whatever the parser left unread (e.g. a trailing newline)
+                while self._reader.read(self.block_size):
+                    pass
+                self.fingerprint = self._reader.digest.hexdigest()[:FINGERPRINT_LENGTH]
+            finally:
+                self._reader.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def _add(self, batch):
+        names = batch.schema.names
+        brand_counts = {}
+        if 'name' in names:
+            counts = pc.value_counts(batch.column(names.index('name')))
+            brand_counts = dict(zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist()))
+            brand_counts.pop(None, None)
+        states = set()
+        if 'province' in names:
+            states = set(pc.unique(batch.column(names.index('province'))).to_pylist()) - {None}
+        with self._lock:
+            self._batches.append(batch)
+            self.rows += batch.num_rows
+            self.brand_counts.update(brand_counts)
+            self.states |= states
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until loading finishes or ``timeout`` seconds pass; return ``done``."""
+        return self._done.wait(timeout)
+
+    @property
+    def progress(self):
+        """Fraction of the file read, or ``None`` when its size is unknown."""
+        if not self.total_bytes or self._reader is None:
+            return None
+        return min(self._reader.bytes_read / self.total_bytes, 1.0)
+
+    def snapshot(self):
+        """Consistent copy of the running aggregates."""
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'brands': len(self.brand_counts),
+                'states': len(self.states),
+                'top_brands': self.brand_counts.most_common(5),
+            }
+
+    def frame(self):
+        """The full DataFrame; waits for the load and re-raises its error."""
+        self.wait()
+        if self.error is not None:
+            raise self.error
+        with self._lock:
+            if self._frame is None:
+                self._frame = pa.Table.from_batches(self._batches, schema=self._schema).to_pandas()
+                self._frame.columns = self._frame.columns.str.strip()
+                self._batches = []
+            return self._frame
+
+    def take(self):
+        """Hand the frame over once, dropping this loader's reference to it.
+
+        Returns ``None`` if it was already taken, so a caller whose cache was
+        evicted knows to read the file again instead.
+        """
+        with self._lock:
+            if self._taken:
+                return None
+        df = self.frame()
+        with self._lock:
+            self._taken = True
+            self._frame = None
+        return df
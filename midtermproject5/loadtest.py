@@ -0,0 +1,171 @@
+"""Load test for the dashboard with simulated concurrent sessions.
+
+Each simulated session is a headless ``AppTest`` of app.py: it renders the
+page once, then performs a random mix of widget interactions (state and
+brand changes, slider moves, toggling the statistics mode), each of which
+reruns the script exactly as a browser interaction would. Sessions run in
+threads of this process, like the sessions of one Streamlit server, so
+they share its caches and its memory budget. Switching tabs is not
+simulated: Streamlit renders every tab on each rerun and a tab switch does
+not reach the server.
+
+For each session count the report shows reruns per second, the rerun
+latency percentiles, the resident memory of the process and how much it
+grew per session added since the previous level. A warm-up session runs
+first, so the imports and cache builds that every session shares are not
+charged to the first level.
+
+Run with:  python loadtest.py --sessions 1 2 4 8 --actions 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifacts import FINGERPRINT_ENV
+from dataset import DASHBOARD_COLUMNS, read_restaurants
+from loader import source_fingerprint
+from shared_data import DATA_SOURCE_ENV, SHARED_DATA_ENV, write_shared_frame
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(APP_DIR, 'FastFoodRestaurants.csv')
+
+# Relative frequency of each interaction in a session
+ACTION_WEIGHTS = {
+    'state': 35,
+    'brand': 25,
+    'slider': 30,
+    'approximate': 10,
+}
+
+
+def rss_mb():
+    """Resident memory of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        import resource
+        # Peak rather than current, where /proc is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _find(widgets, label):
+    return next((w for w in widgets if w.label == label), None)
+
+
+def interact(at, rng):
+    """Perform one random interaction on ``at``; return its name or ``None``."""
+    action = rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+    if action == 'state':
+        widget = _find(at.sidebar.selectbox, "Select State:")
+        if widget is not None:
+            # Most visitors return to the national view now and then
+            widget.select('All' if rng.random() < 0.3 else rng.choice(widget.options))
+    elif action == 'brand':
+        widget = _find(at.sidebar.selectbox, "Select Brand:")
+        if widget is not None:
+            widget.select('All' if rng.random() < 0.3 else rng.choice(widget.options[:30]))
+    elif action == 'slider':
+        widget = rng.choice(list(at.slider)) if len(at.slider) else None
+        if widget is not None and not isinstance(widget.value, tuple):
+            low, high = widget.min, widget.max
+            step = widget.step or 1
+            widget.set_value(low + step * rng.randint(0, int(round((high - low) / step))))
+    else:
+        widget = _find(at.sidebar.checkbox, "Approximate statistics")
+        if widget is not None:
+            widget.set_value(not widget.value)
+    return action if widget is not None else None
+
+
+def run_session(seed, n_actions, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(os.path.join(APP_DIR, 'app.py'), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    first_render = time.perf_counter() - start
+    latencies, failures = [], 0
+    for _ in range(n_actions):
+        if interact(at, rng) is None:
+            continue
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        failures += len(at.exception)
+    return first_render, latencies, failures
+
+
+def run_level(n_sessions, n_actions, seed=0, timeout=300):
+    """Run ``n_sessions`` concurrent sessions and summarize them."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        results = list(pool.map(lambda i: run_session(seed + i, n_actions, timeout), range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([t for _, session, _ in results for t in session])
+    first_renders = np.array([first for first, _, _ in results])
+    return {
+        'Sessions': n_sessions,
+        'Reruns': len(latencies),
+        'Reruns/s': len(latencies) / elapsed,
+        'First Render p50 (s)': np.percentile(first_renders, 50),
+        'p50 (s)': np.percentile(latencies, 50) if len(latencies) else np.nan,
+        'p90 (s)': np.percentile(latencies, 90) if len(latencies) else np.nan,
+        'p99 (s)': np.percentile(latencies, 99) if len(latencies) else np.nan,
+        'Max (s)': latencies.max() if len(latencies) else np.nan,
+        'Exceptions': sum(failures for _, _, failures in results),
+        'RSS (MB)': rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="concurrent session counts to test, in order")
+    parser.add_argument('--actions', type=int, default=20, help="interactions per session")
+    parser.add_argument('--data', default=DEFAULT_DATA, help="path or URL of FastFoodRestaurants.csv")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the report to this CSV file")
+    args = parser.parse_args()
+
+    # Hand the dataset to the app the way serve.py does, so the sessions
+    # measure the dashboard rather than the download
+    shared_path = os.path.join(tempfile.mkdtemp(), 'loadtest.arrow')
+    write_shared_frame(read_restaurants(args.data, DASHBOARD_COLUMNS), shared_path)
+    os.environ[SHARED_DATA_ENV] = shared_path
+    os.environ[DATA_SOURCE_ENV] = args.data
+    os.environ[FINGERPRINT_ENV] = source_fingerprint(args.data)
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    print(f"RSS before warm-up {rss_mb():.0f} MB")
+    run_session(args.seed - 1, args.actions, timeout=300)
+    previous_sessions, previous_rss = 0, rss_mb()
+    print(f"RSS after warm-up {previous_rss:.0f} MB")
+
+    rows = []
+    for n_sessions in args.sessions:
+        row = run_level(n_sessions, args.actions, args.seed)
+        row['RSS Delta (MB)'] = row['RSS (MB)'] - previous_rss
+        added = n_sessions - previous_sessions
+        row['RSS/Added Session (MB)'] = row['RSS Delta (MB)'] / added if added > 0 else np.nan
+        previous_sessions, previous_rss = n_sessions, row['RSS (MB)']
+        rows.append(row)
+        print(f"{n_sessions} sessions: {row['Reruns/s']:.2f} reruns/s, p50 {row['p50 (s)']:.2f}s, "
+              f"p99 {row['p99 (s)']:.2f}s, RSS {row['RSS (MB)']:.0f} MB")
+
+    report = pd.DataFrame(rows).round(3)
+    print()
+    print(report.to_string(index=False))
+    if args.output:
+        report.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Market structure: chain vs independent brands and state concentration.
+
+Every brand is described by a few features computed together from integer
+codes with ``np.bincount`` (one pass over the rows, no per-brand loop):
+location count, number of states, geographic spread (the radius of
+gyration of its locations) and the number of its locations that list the
+brand's most common website domain (from a ``DomainIndex``, see domains.py). Simple thresholds on these features
+label it a national chain, a regional chain or an independent.
+
+State concentration is measured on the state x brand count cube with the
+Herfindahl-Hirschman index (sum of squared market shares, 0-10,000) and
+the four-brand concentration ratio.
+"""
+
+import numpy as np
+import pandas as pd
+
+from topk import group_counts, top_k_per_group
+
+KM_PER_DEGREE = 111.32
+CHAIN_MIN_LOCATIONS = 3
+# Two locations sharing the brand's own website domain also make a chain
+CHAIN_MIN_DOMAIN_LOCATIONS = 2
+NATIONAL_MIN_STATES = 10
+NATIONAL_MIN_SPREAD_KM = 800
+# HHI thresholds of the US merger guidelines
+HHI_MODERATE = 1500
+HHI_HIGH = 2500
+
+
+def brand_features(df, domains=None):
+    """Per-brand location count, state count, spread and website domain."""
+    brand_codes, brands = pd.factorize(df['name'], sort=True)
+    state_codes, states = pd.factorize(df['province'])
+    n_brands = len(brands)
+    has_brand = brand_codes >= 0
+
+    locations = np.bincount(brand_codes[has_brand], minlength=n_brands)
+    n_states = np.asarray((group_counts(brand_codes, state_codes, n_brands, len(states)) > 0).sum(axis=1)).ravel()
+
+    # Radius of gyration from per-brand sums and sums of squares
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    located = has_brand & ~(np.isnan(latitude) | np.isnan(longitude))
+    codes = brand_codes[located]
+    n = np.bincount(codes, minlength=n_brands)
+    n_safe = np.maximum(n, 1)
+    moments = {}
+    for name, values in (('lat', latitude[located]), ('lon', longitude[located])):
+        mean = np.bincount(codes, weights=values, minlength=n_brands) / n_safe
+        square = np.bincount(codes, weights=values * values, minlength=n_brands) / n_safe
+        moments[name] = (mean, np.clip(square - mean * mean, 0, None))
+    lat_mean, lat_var = moments['lat']
+    _, lon_var = moments['lon']
+    spread_km = KM_PER_DEGREE * np.sqrt(lat_var + lon_var * np.cos(np.radians(lat_mean)) ** 2)
+
+    features = pd.DataFrame({
+        'Locations': locations,
+        'States': n_states,
+        'Spread (km)': np.where(n > 1, spread_km, 0.0).round(0),
+    }, index=pd.Index(np.asarray(brands, dtype=object), name='Brand'))
+
+    if domains is not None:
+        top = domains.top_domains().reindex(features.index)
+        features['Domain'] = top['Domain'].astype(object)
+        features['Domain Locations'] = top['Domain Locations'].fillna(0).astype(np.int64)
+    return features
+
+
+def classify_brands(features):
+    """National Chain / Regional Chain / Independent label per brand."""
+    chain = features['Locations'] >= CHAIN_MIN_LOCATIONS
+    if 'Domain Locations' in features:
+        chain |= features['Domain Locations'] >= CHAIN_MIN_DOMAIN_LOCATIONS
+    national = chain & (features['States'] >= NATIONAL_MIN_STATES) & (features['Spread (km)'] >= NATIONAL_MIN_SPREAD_KM)
+    labels = np.select([national, chain], ['National Chain', 'Regional Chain'], 'Independent')
+    return pd.Series(labels, index=features.index, name='Class')
+
+
+def concentration(counts, states):
+    """HHI and four-brand concentration ratio per state from a state x brand count matrix."""
+    totals = np.asarray(counts.sum(axis=1)).ravel()
+    totals_safe = np.maximum(totals, 1)
+    squares = np.asarray(counts.multiply(counts).sum(axis=1)).ravel()
+    groups, _, top = top_k_per_group(counts, 4)
+    top4 = np.bincount(groups, weights=top, minlength=len(totals))
+    hhi = 10_000 * squares / totals_safe ** 2
+    frame = pd.DataFrame({
+        'Restaurants': totals.astype(int),
+        'Brands': np.diff(counts.tocsr().indptr),
+        'HHI': hhi.round(0),
+        'CR4 (%)': (100 * top4 / totals_safe).round(1),
+        'Concentration': np.select([hhi >= HHI_HIGH, hhi >= HHI_MODERATE],
+                                   ['Highly concentrated', 'Moderately concentrated'], 'Unconcentrated'),
+    }, index=pd.Index(states, name='State'))
+    return frame.sort_values('HHI', ascending=False)
@@ -0,0 +1,298 @@
+"""Process-wide memory budget for the dashboard caches.
+
+Every cached loader registers the size of each value it builds, keyed by
+its arguments. When the total goes over the limit, values are evicted one
+at a time with GreedyDual-Size-Frequency: each value has priority
+``clock + (hits + 1) * build_seconds / bytes``, the lowest priority is
+cleared first and the clock moves up to it. Large, cheap-to-rebuild,
+rarely used values go first, and values that are not touched again age out
+the way they would under LRU.
+"""
+
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+MEMORY_LIMIT_ENV = 'FASTFOOD_MEMORY_LIMIT_MB'
+DEFAULT_LIMIT_MB = int(os.environ.get(MEMORY_LIMIT_ENV, 512))
+
+
+def footprint(value, exclude=(), _seen=None, _charged=None):
+    """Approximate number of bytes held by ``value`` and what it references.
+
+    Objects in ``exclude`` (and everything only they reference) are not
+    counted. Arrays memory-mapped from a file are not counted either: their
+    pages belong to the OS page cache. Weak references to the frames and
+    arrays counted are appended to ``_charged`` if given.
+    """
+    seen = {id(v) for v in exclude} if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        _remember(value, _charged)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        _remember(value, _charged)
+        if value.dtype == object:
+            return value.nbytes + sum(footprint(v, (), seen) for v in value.ravel())
+        return value.nbytes
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(footprint(k, (), seen, _charged) + footprint(v, (), seen, _charged)
+                                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(footprint(v, (), seen, _charged) for v in value)
+    if hasattr(value, 'data') and hasattr(value, 'indices') and hasattr(value, 'indptr'):
+        # scipy sparse matrix
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    attributes = list(getattr(value, '__dict__', {}).values())
+    for cls in type(value).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            if hasattr(value, slot):
+                attributes.append(getattr(value, slot))
+    return sys.getsizeof(value) + sum(footprint(a, (), seen, _charged) for a in attributes)
+
+
+def _remember(value, charged):
+    if charged is not None:
+        charged.append(weakref.ref(value))
+
+
+def _reference(value):
+    # Cache arguments are held weakly where possible (frames, arrays) so the
+    # budget does not keep a frame alive that its caller let go of
+    try:
+        return weakref.ref(value)
+    except TypeError:
+        return lambda: value
+
+
+def _key(args, kwargs):
+    # Identifies a cache entry by its arguments: by value if hashable, else by
+    # identity. Streamlit hashes the contents instead, so an equal copy of a
+    # frame hits its cache but is not matched here; it is then simply not
+    # counted as a hit.
+    def part(value):
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return ('id', id(value))
+    return tuple(part(a) for a in args) + tuple((k, part(v)) for k, v in sorted(kwargs.items()))
+
+
+class _Item:
+    """One cached value: the arguments it was built from and its size."""
+
+    __slots__ = ('args', 'kwargs', 'nbytes', 'charged', 'built_at', 'hits', 'priority')
+
+    def __init__(self, args, kwargs, nbytes, charged):
+        self.args = [_reference(a) for a in args]
+        self.kwargs = {k: _reference(v) for k, v in kwargs.items()}
+        self.nbytes = nbytes
+        self.charged = charged
+        self.built_at = time.monotonic()
+        self.hits = 0
+        self.priority = 0.0
+
+
+class _Entry:
+    """A cached function with its live values, in least recently used order."""
+
+    __slots__ = ('clear', 'ttl', 'max_entries', 'items', 'build_seconds', 'hits', 'misses', 'evictions')
+
+    def __init__(self, clear, ttl=None, max_entries=None):
+        self.clear = clear
+        # Streamlit takes seconds, a timedelta or a string such as "1h"
+        self.ttl = ttl if ttl is None or isinstance(ttl, (int, float)) else pd.Timedelta(ttl).total_seconds()
+        self.max_entries = max_entries
+        self.items = collections.OrderedDict()
+        self.build_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self):
+        return sum(item.nbytes for item in self.items.values())
+
+    def evict(self, key):
+        """Clear the cached value of ``key`` only, or the whole cache if its
+        arguments are gone and the value cannot be addressed any more."""
+        item = self.items.pop(key)
+        args = [ref() for ref in item.args]
+        kwargs = {k: ref() for k, ref in item.kwargs.items()}
+        if any(a is None for a in args) or any(v is None for v in kwargs.values()):
+            self.clear()
+            self.items.clear()
+        else:
+            self.clear(*args, **kwargs)
+
+
+class MemoryBudget:
+    """Tracks the footprint of all registered caches and evicts over a limit."""
+
+    def __init__(self, limit_bytes=DEFAULT_LIMIT_MB * 1024 * 1024):
+        self.limit_bytes = limit_bytes
+        self._entries = {}
+        self._clock = 0.0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def cached(self, cache_decorator, **cache_options):
+        """Wrap a function in a Streamlit cache that reports to this budget.
+
+        ``cache_decorator`` is ``st.cache_data`` or ``st.cache_resource``;
+        ``cache_options`` are passed through to it. Values Streamlit drops
+        on its own (``ttl``, ``max_entries``) are dropped from the budget the
+        same way: after ``ttl`` seconds, and least recently used first.
+        """
+        def decorator(func):
+            name = func.__name__
+
+            @functools.wraps(func)
+            def build(*args, **kwargs):
+                start = time.perf_counter()
+                value = func(*args, **kwargs)
+                self._record_build(name, args, kwargs, value, time.perf_counter() - start)
+                return value
+
+            cached_func = cache_decorator(**cache_options)(build)
+            with self._lock:
+                # The app script re-runs (and re-decorates) on every interaction;
+                # keep the counters of a cache that is already registered
+                if name in self._entries:
+                    self._entries[name].clear = cached_func.clear
+                else:
+                    self._entries[name] = _Entry(cached_func.clear, cache_options.get('ttl'),
+                                                 cache_options.get('max_entries'))
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                builds = getattr(self._local, 'builds', 0)
+                value = cached_func(*args, **kwargs)
+                if getattr(self._local, 'builds', 0) == builds:
+                    self._record_hit(name, _key(args, kwargs))
+                return value
+
+            wrapper.clear = cached_func.clear
+            return wrapper
+        return decorator
+
+    def _priority(self, entry, item):
+        return self._clock + (item.hits + 1) * max(entry.build_seconds, 1e-6) / max(item.nbytes, 1)
+
+    def _record_hit(self, name, key):
+        with self._lock:
+            entry = self._entries[name]
+            entry.hits += 1
+            item = entry.items.get(key)
+            if item is not None:
+                item.hits += 1
+                item.priority = self._priority(entry, item)
+                entry.items.move_to_end(key)
+
+    def _charged(self):
+        # Frames and arrays already counted by a live cache value
+        return [obj for entry in self._entries.values() for item in entry.items.values()
+                for obj in (ref() for ref in item.charged) if obj is not None]
+
+    def _record_build(self, name, args, kwargs, value, seconds):
+        self._local.builds = getattr(self._local, 'builds', 0) + 1
+        with self._lock:
+            self._expire()
+            entry = self._entries[name]
+            entry.misses += 1
+            entry.build_seconds = max(entry.build_seconds, seconds)
+            # The arguments belong to the caller, and objects shared with other
+            # cached values (the dataset inside most of them) are counted once
+            charged = []
+            nbytes = footprint(value, [*args, *kwargs.values(), *self._charged()], _charged=charged)
+            key = _key(args, kwargs)
+            # A rebuild of a value Streamlit dropped replaces it
+            entry.items.pop(key, None)
+            item = entry.items[key] = _Item(args, kwargs, nbytes, charged)
+            item.priority = self._priority(entry, item)
+            if entry.max_entries is not None:
+                while len(entry.items) > entry.max_entries:
+                    entry.items.popitem(last=False)
+            self._enforce(protect=(name, key))
+
+    def resize(self, name, delta_bytes, *args, **kwargs):
+        """Record that the value cached for ``args`` grew (or shrank) after it
+        was built, for caches that fill up in place such as the filter result
+        cache.
+        """
+        with self._lock:
+            entry = self._entries[name]
+            key = _key(args, kwargs)
+            item = entry.items.get(key)
+            if item is None:
+                return
+            item.nbytes = max(item.nbytes + delta_bytes, 0)
+            item.priority = self._priority(entry, item)
+            if delta_bytes > 0:
+                self._enforce(protect=(name, key))
+
+    def _expire(self):
+        now = time.monotonic()
+        for entry in self._entries.values():
+            if entry.ttl is not None:
+                for key in [k for k, item in entry.items.items() if now - item.built_at > entry.ttl]:
+                    del entry.items[key]
+
+    def _enforce(self, protect=None):
+        while self.used_bytes > self.limit_bytes:
+            candidates = [(item.priority, name, key) for name, entry in self._entries.items()
+                          for key, item in entry.items.items() if item.nbytes and (name, key) != protect]
+            if not candidates:
+                break
+            priority, name, key = min(candidates, key=lambda c: c[0])
+            self._clock = priority
+            entry = self._entries[name]
+            entry.evict(key)
+            entry.evictions += 1
+
+    @property
+    def used_bytes(self):
+        with self._lock:
+            self._expire()
+            return sum(e.nbytes for e in self._entries.values())
+
+    def clear(self):
+        """Clear every registered cache."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.clear()
+                entry.items.clear()
+
+    def stats(self):
+        """Per-cache size, entry count and hit/miss/eviction counters."""
+        with self._lock:
+            self._expire()
+            rows = [{
+                'Cache': name,
+                'Entries': len(e.items),
+                'Size (MB)': round(e.nbytes / 1024 ** 2, 2),
+                'Build Time (s)': round(e.build_seconds, 3),
+                'Hits': e.hits,
+                'Misses': e.misses,
+                'Evictions': e.evictions,
+            } for name, e in self._entries.items()]
+        return pd.DataFrame(rows)
+
+
+# Shared by every session running in this process
+budget = MemoryBudget()
@@ -0,0 +1,91 @@
+"""Drawing helpers for the dashboard charts."""
+
+import numpy as np
+
+from lazyimports import lazy_import
+
+mcolors = lazy_import('matplotlib.colors')
+
+# Above this many points the scatter is splatted into a raster image
+SPLAT_THRESHOLD = 20_000
+SPLAT_SHAPE = (600, 1000)  # rows, columns
+
+
+def splat_points(x, y, color_codes, colors, extent, shape=SPLAT_SHAPE, alpha=0.8):
+    """Rasterize points into an RGBA image, one pixel per point.
+
+    Where several points fall in the same pixel, the lowest color code wins,
+    so highlighted brands stay visible over the "Other" color.
+    """
+    x_min, x_max, y_min, y_max = extent
+    rows, cols = shape
+    col = np.clip(((x - x_min) / (x_max - x_min or 1) * (cols - 1)).astype(np.int64), 0, cols - 1)
+    row = np.clip(((y - y_min) / (y_max - y_min or 1) * (rows - 1)).astype(np.int64), 0, rows - 1)
+    winner = np.full(rows * cols, len(colors), dtype=np.int64)
+    np.minimum.at(winner, row * cols + col, color_codes)
+    palette = np.array([mcolors.to_rgba(c, alpha) for c in colors] + [(0, 0, 0, 0)])
+    return palette[winner].reshape(rows, cols, 4)
+
+
+def draw_brand_points(ax, x, y, color_codes, colors, alpha=0.6, size=None):
+    """Draw points colored by ``colors[color_codes]`` in a single call.
+
+    Small selections use one vectorized ``scatter``; large ones are splatted
+    into an image so render time stays flat in the number of points.
+    ``size`` fixes the marker size instead of scaling it with the count.
+    """
+    if len(x) > SPLAT_THRESHOLD:
+        extent = (np.nanmin(x), np.nanmax(x), np.nanmin(y), np.nanmax(y))
+        valid = ~(np.isnan(x) | np.isnan(y))
+        image = splat_points(x[valid], y[valid], color_codes[valid], colors, extent)
+        ax.imshow(image, extent=extent, origin='lower', aspect='auto', interpolation='nearest')
+        return
+    if size is None:
+        size = 30 if len(x) <= 1000 else max(2, 30 * np.sqrt(1000 / len(x)))
+    # Draw the highest codes ("Other") first so highlighted brands end up on top
+    order = np.argsort(-color_codes, kind='stable')
+    ax.scatter(x[order], y[order], c=color_codes[order], cmap=mcolors.ListedColormap(colors),
+               vmin=-0.5, vmax=len(colors) - 0.5, alpha=alpha, s=size)
+
+
+# Share of a small-multiples panel's width taken by the bar labels
+LABEL_WIDTH = 0.45
+BAR_WIDTH = 0.5
+
+
+def draw_small_multiples(ax, panels, values, labels, titles, colors, n_cols=4):
+    """Tile ranked horizontal bar charts, one panel per title, into one Axes.
+
+    ``panels`` is the panel index of every bar (bars of a panel in display
+    order), ``values`` and ``labels`` its length and label. All bars go into
+    a single ``barh`` call and every panel is scaled to its own maximum, so
+    drawing cost grows with the number of bars, not with a grid of Axes.
+    """
+    panels = np.asarray(panels)
+    order = np.argsort(panels, kind='stable')
+    panels = panels[order]
+    values = np.asarray(values, dtype=np.float64)[order]
+    labels = np.asarray(labels, dtype=object)[order]
+    n_panels = len(titles)
+    rank = np.arange(len(panels)) - np.searchsorted(panels, panels)
+    slots = int(rank.max()) + 1 if len(rank) else 1
+    height = slots + 2  # title line and a gap under every panel
+    maximum = np.ones(n_panels)
+    np.maximum.at(maximum, panels, values)
+
+    column, row = panels % n_cols, panels // n_cols
+    y = row * height + 1.5 + rank
+    left = column + LABEL_WIDTH
+    palette = np.array([mcolors.to_rgba(c) for c in colors])
+    ax.barh(y, BAR_WIDTH * values / maximum[panels], left=left, height=0.8,
+            color=palette[rank % len(palette)])
+    for bar_y, bar_left, label, value in zip(y, left, labels, values):
+        ax.text(bar_left - 0.01, bar_y, f"{label} ({value:.0f})", ha='right', va='center', fontsize=8)
+    for panel, title in enumerate(titles):
+        ax.text(panel % n_cols + 0.5, panel // n_cols * height + 0.5, title,
+                ha='center', va='center', fontsize=11, fontweight='bold')
+
+    n_rows = -(-n_panels // n_cols)
+    ax.set_xlim(0, n_cols)
+    ax.set_ylim(n_rows * height - 0.5, 0)
+    ax.axis('off')
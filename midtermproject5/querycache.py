@@ -0,0 +1,145 @@
+"""Result cache for the dashboard's filter combinations.
+
+Most visits use a few (state, city, ZIP, brand) combinations. For each one
+the cache keeps the selected row positions together with everything the
+overview derives from them (counts, distinct values, missing values and
+the brand and state counts the top-N lists are selected from), so a
+repeated combination costs a dictionary lookup.
+
+Eviction is least-frequently-used, in O(1): entries sit in per-frequency
+buckets ordered by last use, and the oldest entry of the lowest frequency
+is dropped first. The cache is bounded both by entry count and by the
+bytes its results hold (an unfiltered result keeps every row position),
+and reports every change in size to ``on_resize`` so the process-wide
+memory budget sees it grow.
+"""
+
+import collections
+import threading
+
+import numpy as np
+import pandas as pd
+
+from topk import top_counts
+
+
+class FilterResult:
+    """Row positions of one filter combination and its derived statistics."""
+
+    __slots__ = ('rows', 'total', 'unique_brands', 'states_covered', 'missing_values',
+                 'brand_counts', 'state_counts', 'nbytes', '_cache')
+
+    def __init__(self, cache, rows):
+        self._cache = cache
+        # Row positions fit in int32 below 2**31 rows, half the int64 size
+        self.rows = rows.astype(np.int32) if len(cache.df) < 2 ** 31 else rows
+        self.total = len(rows)
+        # Counts per brand/state code; the top-N lists are selected from these
+        brand_codes, state_codes = cache.brand_codes[rows], cache.state_codes[rows]
+        self.brand_counts = np.bincount(brand_codes[brand_codes >= 0], minlength=len(cache.brands))
+        self.state_counts = np.bincount(state_codes[state_codes >= 0], minlength=len(cache.states))
+        self.unique_brands = int(np.count_nonzero(self.brand_counts))
+        self.states_covered = int(np.count_nonzero(self.state_counts))
+        self.missing_values = int(cache.df.iloc[rows].isnull().sum().sum())
+        self.nbytes = self.rows.nbytes + self.brand_counts.nbytes + self.state_counts.nbytes
+
+    def top_brands(self, n):
+        """The ``n`` brands with the most locations, as a Series of counts."""
+        return top_counts(self.brand_counts, self._cache.brands, n)
+
+    def top_states(self, n):
+        """The ``n`` states with the most locations, as a Series of counts."""
+        return top_counts(self.state_counts, self._cache.states, n)
+
+
+class FilterCache:
+    """LFU cache of ``FilterResult`` keyed by the normalized filter tuple.
+
+    ``max_bytes`` bounds the total size of the cached results (``None`` for
+    no bound); ``on_resize(delta)`` is called with the change in bytes
+    whenever a result is added or evicted.
+    """
+
+    def __init__(self, df, capacity=128, max_bytes=None, on_resize=None):
+        self.df = df
+        self.brand_codes, self.brands = pd.factorize(df['name'])
+        self.state_codes, self.states = pd.factorize(df['province'])
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.on_resize = on_resize
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}  # key -> (result, frequency)
+        self._buckets = collections.defaultdict(collections.OrderedDict)
+        self._min_frequency = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*filters):
+        """Normalized key: ``'All'`` and empty selections become ``None``."""
+        return tuple(None if f in (None, '', 'All') else f for f in filters)
+
+    def _touch(self, key):
+        result, frequency = self._entries[key]
+        del self._buckets[frequency][key]
+        if not self._buckets[frequency]:
+            del self._buckets[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency = frequency + 1
+        self._buckets[frequency + 1][key] = None
+        self._entries[key] = (result, frequency + 1)
+        return result
+
+    def get(self, key, compute_rows):
+        """Cached result for ``key``; ``compute_rows()`` gives its rows on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._touch(key)
+            self.misses += 1
+        result = FilterResult(self, compute_rows())
+        with self._lock:
+            if key in self._entries:
+                return self._touch(key)
+            delta = result.nbytes
+            while self._entries and (len(self._entries) >= self.capacity or
+                                     (self.max_bytes is not None and
+                                      self.nbytes + result.nbytes > self.max_bytes)):
+                delta -= self._evict()
+            self._entries[key] = (result, 1)
+            self._buckets[1][key] = None
+            self._min_frequency = 1
+            self.nbytes += result.nbytes
+        if self.on_resize is not None:
+            self.on_resize(delta)
+        return result
+
+    def _evict(self):
+        # Oldest entry of the lowest frequency; returns the bytes freed
+        evicted, _ = self._buckets[self._min_frequency].popitem(last=False)
+        if not self._buckets[self._min_frequency]:
+            del self._buckets[self._min_frequency]
+            # The new entry resets the minimum to 1 right after eviction;
+            # until then the next lowest bucket is the minimum
+            if self._buckets:
+                self._min_frequency = min(self._buckets)
+        result, _ = self._entries.pop(evicted)
+        self.nbytes -= result.nbytes
+        self.evictions += 1
+        return result.nbytes
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Most frequently used combinations and their use counts."""
+        with self._lock:
+            rows = [{'Filters': ' / '.join(str(f) for f in key if f is not None) or 'All',
+                     'Uses': frequency, 'Rows': result.total}
+                    for key, (result, frequency) in self._entries.items()]
+        frame = pd.DataFrame(rows, columns=['Filters', 'Uses', 'Rows'])
+        return frame.sort_values('Uses', ascending=False, ignore_index=True)
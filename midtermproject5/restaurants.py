@@ -0,0 +1,217 @@
+"""Compact, array-backed restaurant records.
+
+Coordinates live in contiguous float32 arrays (about a metre of
+precision) and brand/state/city/postal code are stored as integer codes
+into sorted string tables. Tables and addresses are UTF-8 buffers with
+offsets rather than Python strings, so a record costs about 50 bytes
+instead of a row of Python objects.
+``Restaurant`` objects are lightweight views into the store and are only
+created when iterated or indexed.
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+
+def _pack(strings):
+    # One UTF-8 buffer plus offsets; uint32 offsets while the buffer fits
+    encoded = [v.encode('utf-8') for v in strings]
+    lengths = np.fromiter((len(v) for v in encoded), dtype=np.int64, count=len(encoded))
+    total = int(lengths.sum())
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32 if total < 2 ** 32 else np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class StringTable:
+    """Sorted strings addressed by integer code (-1 means missing)."""
+
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self, values):
+        self._data, self._offsets = _pack(str(v) for v in values)
+
+    @classmethod
+    def from_buffers(cls, data, offsets):
+        """Table over an existing buffer and offsets (e.g. memory-mapped)."""
+        table = cls.__new__(cls)
+        table._data, table._offsets = data, offsets
+        return table
+
+    @classmethod
+    def encode(cls, column):
+        codes, uniques = pd.factorize(column, sort=True)
+        dtype = np.int16 if len(uniques) < np.iinfo(np.int16).max else np.int32
+        return codes.astype(dtype), cls(uniques)
+
+    def code(self, value):
+        # Values are sorted, so a binary search decodes O(log n) of them
+        position = bisect.bisect_left(range(len(self)), value, key=self.__getitem__)
+        return position if position < len(self) and self[position] == value else -1
+
+    def __getitem__(self, code):
+        if code < 0:
+            return None
+        return self._data[self._offsets[code]:self._offsets[code + 1]].tobytes().decode('utf-8')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def values(self):
+        return tuple(self[i] for i in range(len(self)))
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes + self._offsets.nbytes
+
+
+class Restaurant:
+    """Read-only view of a single row of a ``RestaurantStore``."""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def name(self):
+        return self._store.brands[self._store.brand_codes[self._index]]
+
+    @property
+    def state(self):
+        return self._store.states[self._store.state_codes[self._index]]
+
+    @property
+    def city(self):
+        return self._store.cities[self._store.city_codes[self._index]]
+
+    @property
+    def postal_code(self):
+        return self._store.postal_codes[self._store.postal_code_codes[self._index]]
+
+    @property
+    def address(self):
+        return self._store.address(self._index)
+
+    # float32 coordinates are good to about 5 decimals (a metre)
+    @property
+    def latitude(self):
+        return round(float(self._store.latitude[self._index]), 5)
+
+    @property
+    def longitude(self):
+        return round(float(self._store.longitude[self._index]), 5)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'province': self.state,
+            'city': self.city,
+            'postalCode': self.postal_code,
+            'address': self.address,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+        }
+
+    def __repr__(self):
+        return f"Restaurant({self.name!r}, {self.city!r}, {self.state!r})"
+
+
+# Per-row arrays and string tables of a store, by attribute name
+_STORE_ARRAYS = ('latitude', 'longitude', 'brand_codes', 'state_codes', 'city_codes', 'postal_code_codes')
+_STORE_TABLES = ('brands', 'states', 'cities', 'postal_codes')
+
+
+class RestaurantStore:
+    """Column store of restaurant locations."""
+
+    __slots__ = ('latitude', 'longitude', 'brand_codes', 'brands', 'state_codes', 'states',
+                 'city_codes', 'cities', 'postal_code_codes', 'postal_codes',
+                 '_address_data', '_address_offsets')
+
+    @classmethod
+    def from_frame(cls, df):
+        store = cls()
+        n = len(df)
+        store.latitude = (df['latitude'].to_numpy(dtype=np.float32) if 'latitude' in df
+                          else np.full(n, np.nan, dtype=np.float32))
+        store.longitude = (df['longitude'].to_numpy(dtype=np.float32) if 'longitude' in df
+                           else np.full(n, np.nan, dtype=np.float32))
+        store.brand_codes, store.brands = StringTable.encode(df['name'])
+        store.state_codes, store.states = StringTable.encode(df['province'])
+        store.city_codes, store.cities = StringTable.encode(df['city'] if 'city' in df else pd.Series([None] * n))
+        store.postal_code_codes, store.postal_codes = StringTable.encode(
+            df['postalCode'].astype('string') if 'postalCode' in df else pd.Series([None] * n))
+
+        # Addresses are mostly unique, so they are kept as one UTF-8 buffer
+        # plus offsets and only decoded when a record is read
+        addresses = df['address'].fillna('') if 'address' in df else pd.Series([''] * n)
+        store._address_data, store._address_offsets = _pack(addresses.astype(str))
+        return store
+
+    def arrays(self):
+        """The store as a flat dict of arrays, for ``from_arrays``."""
+        arrays = {name: getattr(self, name) for name in _STORE_ARRAYS}
+        for name in _STORE_TABLES:
+            table = getattr(self, name)
+            arrays[f"{name}_data"], arrays[f"{name}_offsets"] = table._data, table._offsets
+        arrays['address_data'], arrays['address_offsets'] = self._address_data, self._address_offsets
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Store over the arrays of ``arrays()``, without copying them."""
+        store = cls()
+        for name in _STORE_ARRAYS:
+            setattr(store, name, arrays[name])
+        for name in _STORE_TABLES:
+            setattr(store, name, StringTable.from_buffers(arrays[f"{name}_data"], arrays[f"{name}_offsets"]))
+        store._address_data, store._address_offsets = arrays['address_data'], arrays['address_offsets']
+        return store
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Restaurant(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Restaurant(self, i)
+
+    def address(self, index):
+        start, end = self._address_offsets[index], self._address_offsets[index + 1]
+        return self._address_data[start:end].tobytes().decode('utf-8')
+
+    def select(self, state=None, brand=None):
+        """Return the row positions matching the optional state and brand."""
+        mask = np.ones(len(self), dtype=bool)
+        if state is not None:
+            mask &= self.state_codes == self.states.code(state)
+        if brand is not None:
+            mask &= self.brand_codes == self.brands.code(brand)
+        return np.flatnonzero(mask)
+
+    def records(self, indices):
+        return [Restaurant(self, int(i)) for i in indices]
+
+    def coordinates(self, indices=None):
+        """Return an ``(n, 2)`` array of longitude/latitude pairs."""
+        if indices is None:
+            return np.column_stack([self.longitude, self.latitude])
+        return np.column_stack([self.longitude[indices], self.latitude[indices]])
+
+    @property
+    def nbytes(self):
+        arrays = (self.latitude, self.longitude, self.brand_codes, self.state_codes,
+                  self.city_codes, self.postal_code_codes, self._address_data, self._address_offsets)
+        tables = (self.brands, self.states, self.cities, self.postal_codes)
+        return sum(a.nbytes for a in arrays) + sum(t.nbytes for t in tables)
@@ -0,0 +1,87 @@
+"""Level-of-detail point sampling for map views.
+
+Every row gets one random key. For each zoom level the rows are presorted
+by (grid cell, key), with cells halving in size from one level to the
+next. Sampling a selection then only walks that presorted order: within
+each cell the rows with the smallest keys are kept, a uniform sample
+without replacement (the same result as reservoir sampling), with a quota
+proportional to the cell's share of the selection. Dense areas stay dense
+and sparse areas keep at least one point, while the number of points drawn
+stays close to the budget no matter how large the selection is.
+"""
+
+import numpy as np
+
+BASE_CELL_DEGREES = 4.0
+ZOOM_LEVELS = 7
+
+
+class LevelOfDetailSampler:
+    """Presorted per-zoom-level grid over the restaurant coordinates."""
+
+    def __init__(self, longitude, latitude, base_cell=BASE_CELL_DEGREES, levels=ZOOM_LEVELS, seed=0):
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.base_cell = base_cell
+        keys = np.random.default_rng(seed).random(len(self.longitude))
+        valid = ~(np.isnan(self.longitude) | np.isnan(self.latitude))
+
+        self.orders, self.sorted_cells = [], []
+        for level in range(levels):
+            size = base_cell / 2 ** level
+            row = np.floor(np.where(valid, self.latitude, 0) / size).astype(np.int64)
+            col = np.floor(np.where(valid, self.longitude, 0) / size).astype(np.int64)
+            # Rows without coordinates all share one cell that sorts last
+            cell = np.where(valid, (row + (1 << 20)) * (1 << 21) + (col + (1 << 20)), np.iinfo(np.int64).max)
+            order = np.lexsort((keys, cell))
+            self.orders.append(order)
+            self.sorted_cells.append(cell[order])
+
+    def arrays(self):
+        """The presorted orders and cells of every level, for ``from_arrays``."""
+        return {
+            'base_cell': np.array(self.base_cell),
+            'orders': np.stack(self.orders),
+            'sorted_cells': np.stack(self.sorted_cells),
+        }
+
+    @classmethod
+    def from_arrays(cls, longitude, latitude, arrays):
+        """Sampler over the coordinates with the levels of ``arrays()``."""
+        sampler = cls.__new__(cls)
+        sampler.longitude = np.asarray(longitude, dtype=np.float64)
+        sampler.latitude = np.asarray(latitude, dtype=np.float64)
+        sampler.base_cell = float(arrays['base_cell'])
+        sampler.orders = list(arrays['orders'])
+        sampler.sorted_cells = list(arrays['sorted_cells'])
+        return sampler
+
+    def level_for(self, rows):
+        """Pick the zoom level whose cells fit the extent of ``rows``."""
+        lon, lat = self.longitude[rows], self.latitude[rows]
+        if len(rows) == 0 or np.all(np.isnan(lon)):
+            return 0
+        span = max(np.nanmax(lon) - np.nanmin(lon), np.nanmax(lat) - np.nanmin(lat), 1e-6)
+        # About 15 cells across the view at every level
+        level = int(np.floor(np.log2(15 * self.base_cell / span)))
+        return int(np.clip(level, 0, len(self.orders) - 1))
+
+    def sample(self, rows, budget, level=None):
+        """Return a spatially stratified subset of ``rows`` of about ``budget`` rows."""
+        rows = np.asarray(rows)
+        if len(rows) <= budget:
+            return rows
+        if level is None:
+            level = self.level_for(rows)
+        selected = np.zeros(len(self.longitude), dtype=bool)
+        selected[rows] = True
+        in_selection = selected[self.orders[level]]
+        order = self.orders[level][in_selection]
+        cells = self.sorted_cells[level][in_selection]
+
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        counts = np.diff(np.append(starts, len(cells)))
+        rank = np.arange(len(cells)) - np.repeat(starts, counts)
+        quota = np.ceil(counts * (budget / len(rows))).astype(np.int64)
+        keep = rank < np.repeat(quota, counts)
+        return np.sort(order[keep])
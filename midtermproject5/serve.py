@@ -0,0 +1,196 @@
+"""Multi-process deployment of the Streamlit dashboard.
+
+Starts N Streamlit workers running app.py, each on its own local port,
+and a TCP load balancer in front of them. The dataset is parsed once by
+the launcher and written to a memory-mapped Arrow file (see
+shared_data.py) that every worker maps read-only. The launcher also builds
+the precomputed aggregates (see artifacts.py) once, and workers map those
+read-only too instead of each deriving them, so the data and its indexes
+are held once in the page cache. The cache memory limit is split between
+the workers, so the total stays bounded as workers are added.
+
+Streamlit keeps session state and the generated chart images inside the
+worker that served the page, so a client must keep talking to the same
+worker. The balancer reads the request head of every connection and routes
+it by a consistent hash of the client: the first ``X-Forwarded-For``
+address when an ingress or reverse proxy sets one (the TCP peer is then
+the proxy, the same for every client), else an affinity cookie if one is
+configured, else the peer address. Adding or losing a worker only moves
+the clients that hashed to it.
+
+Run with:  python serve.py --workers 4 --port 8501
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+
+from artifacts import ARTIFACTS_ENV, FINGERPRINT_ENV, ArtifactStore
+from dataset import DASHBOARD_COLUMNS, read_restaurants
+from loader import source_fingerprint
+from memory import DEFAULT_LIMIT_MB, MEMORY_LIMIT_ENV
+from shared_data import DATA_SOURCE_ENV, SHARED_DATA_ENV, write_shared_frame
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(APP_DIR, 'FastFoodRestaurants.csv')
+# Largest request head read for routing; longer heads are routed by peer address
+MAX_HEAD_BYTES = 16 * 1024
+
+
+class ConsistentHashRing:
+    """Hash ring with virtual nodes mapping keys to workers."""
+
+    def __init__(self, nodes, replicas=100):
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def nodes_for(self, key):
+        """Yield the distinct nodes for ``key`` in ring order (primary first)."""
+        start = bisect.bisect(self._keys, self._hash(key))
+        seen = set()
+        for i in range(len(self._ring)):
+            node = self._ring[(start + i) % len(self._ring)][1]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def client_key(head, peer, cookie_name=None):
+    """Routing key of a connection from its request head and peer address."""
+    headers = {}
+    for line in head.decode('latin-1').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    forwarded = headers.get('x-forwarded-for', '').split(',')[0].strip()
+    if forwarded:
+        return forwarded
+    if cookie_name:
+        for cookie in headers.get('cookie', '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == cookie_name and value:
+                return f"cookie:{value}"
+    return peer
+
+
+async def _read_head(reader):
+    """Request head (through the blank line), or whatever arrived if it is not HTTP."""
+    try:
+        return await reader.readuntil(b'\r\n\r\n'), True
+    except asyncio.IncompleteReadError as e:
+        return e.partial, False
+    except asyncio.LimitOverrunError:
+        return await reader.read(MAX_HEAD_BYTES), False
+
+
+async def _proxy(ring, client_reader, client_writer, cookie_name=None):
+    peer = client_writer.get_extra_info('peername')[0]
+    head, complete = await _read_head(client_reader)
+    key = client_key(head, peer, cookie_name) if complete else peer
+    for port in ring.nodes_for(key):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', port)
+            break
+        except OSError:
+            # Worker down or still starting; fall through to the next one on the ring
+            continue
+    else:
+        client_writer.close()
+        return
+    # The head was consumed for routing; send it on before piping the rest
+    upstream_writer.write(head)
+    await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+
+
+async def run_balancer(ring, host, port, cookie_name=None):
+    server = await asyncio.start_server(lambda r, w: _proxy(ring, r, w, cookie_name), host, port,
+                                        limit=MAX_HEAD_BYTES)
+    async with server:
+        await server.serve_forever()
+
+
+def start_workers(n_workers, base_port, data_source, fingerprint, shared_path, artifact_dir, memory_limit_mb):
+    env = dict(os.environ, **{
+        DATA_SOURCE_ENV: data_source,
+        FINGERPRINT_ENV: fingerprint,
+        SHARED_DATA_ENV: shared_path,
+        ARTIFACTS_ENV: artifact_dir,
+        MEMORY_LIMIT_ENV: str(max(memory_limit_mb // n_workers, 1)),
+    })
+    workers = []
+    for i in range(n_workers):
+        command = [
+            sys.executable, '-m', 'streamlit', 'run', os.path.join(APP_DIR, 'app.py'),
+            '--server.port', str(base_port + i),
+            '--server.address', '127.0.0.1',
+            '--server.headless', 'true',
+        ]
+        workers.append(subprocess.Popen(command, env=env, cwd=APP_DIR))
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dashboard on several worker processes.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8501, help="public port of the load balancer")
+    parser.add_argument('--base-port', type=int, default=8600, help="first local worker port")
+    parser.add_argument('--data', default=DEFAULT_DATA, help="path or URL of FastFoodRestaurants.csv")
+    parser.add_argument('--affinity-cookie', default=None,
+                        help="cookie that identifies a client (e.g. a sticky-session cookie set by the ingress)")
+    parser.add_argument('--artifacts', default=os.path.join(APP_DIR, 'artifacts'),
+                        help="directory of the precomputed aggregates shared by the workers")
+    parser.add_argument('--memory-limit-mb', type=int, default=DEFAULT_LIMIT_MB,
+                        help="cache memory limit of all workers together")
+    parser.add_argument('--shared-path', default=os.path.join(tempfile.gettempdir(), 'fastfood_shared.arrow'))
+    args = parser.parse_args()
+
+    df = read_restaurants(args.data, [*DASHBOARD_COLUMNS, 'websites'])
+    websites = df.pop('websites')
+    write_shared_frame(df, args.shared_path)
+    print(f"Shared {len(df)} rows through {args.shared_path}")
+    fingerprint = source_fingerprint(args.data)
+    artifacts = ArtifactStore(args.artifacts).build(df, fingerprint, websites)
+    print(f"Shared aggregates through {artifacts.path}")
+
+    workers = start_workers(args.workers, args.base_port, args.data, fingerprint, args.shared_path,
+                            args.artifacts, args.memory_limit_mb)
+    ring = ConsistentHashRing([args.base_port + i for i in range(args.workers)])
+    print(f"Balancing {args.workers} workers on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(run_balancer(ring, args.host, args.port, args.affinity_cookie))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == '__main__':
+    main()
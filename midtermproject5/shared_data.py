@@ -0,0 +1,37 @@
+"""Dataset file shared between worker processes.
+
+The launcher writes the cleaned dataset once as an uncompressed Arrow IPC
+file. Workers memory-map it and wrap the Arrow buffers in a DataFrame
+without copying, so N workers share a single copy of the data through the
+OS page cache instead of each parsing and holding its own.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+# Environment variable through which workers find the shared file
+SHARED_DATA_ENV = 'FASTFOOD_SHARED_DATA'
+# Path or URL the shared file was written from, for the columns it leaves out
+DATA_SOURCE_ENV = 'FASTFOOD_DATA'
+
+
+def write_shared_frame(df, path):
+    """Write ``df`` to ``path`` atomically in a memory-mappable layout."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_shared_frame(path):
+    """Map the shared file read-only and return a zero-copy DataFrame."""
+    source = pa.memory_map(path, 'r')
+    table = ipc.open_file(source).read_all()
+    # Dictionary columns become categoricals (Arrow dictionary arrays in
+    # pandas cannot be sorted), everything else stays in the mapped buffers
+    return table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
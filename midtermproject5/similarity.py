@@ -0,0 +1,153 @@
+"""Regional brand preference engine.
+
+Builds a sparse state x brand location count matrix once and derives from
+it, with sparse vectorized operations:
+
+* cosine similarity between every pair of states,
+* Jensen-Shannon divergence between the states' brand mixes,
+* brand co-location affinity (cosine between brands over states),
+* "taste regions": a hierarchical clustering of states on their brand mix.
+
+New locations can be added incrementally; only the rows of the states
+they touch are recomputed.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from lazyimports import lazy_import
+
+# Only taste_regions() needs it, and it pulls in scipy.spatial
+hierarchy = lazy_import('scipy.cluster.hierarchy')
+
+
+class RegionalPreferences:
+    """State x brand count matrix with cached similarity matrices."""
+
+    def __init__(self, df):
+        self.states = pd.Index(sorted(df['province'].dropna().unique()))
+        self.brands = pd.Index(sorted(df['name'].dropna().unique()))
+        self.counts = self._count_matrix(df)
+        self._refresh()
+
+    @classmethod
+    def from_counts(cls, states, brands, counts):
+        """Build from a precomputed count matrix (anything ``csr_matrix`` accepts)."""
+        preferences = cls.__new__(cls)
+        preferences.states = pd.Index(states)
+        preferences.brands = pd.Index(brands)
+        preferences.counts = sparse.csr_matrix(counts, shape=(len(states), len(brands)), dtype=np.float64)
+        preferences._refresh()
+        return preferences
+
+    def _count_matrix(self, df):
+        df = df.dropna(subset=['province', 'name'])
+        rows = self.states.get_indexer(df['province'])
+        cols = self.brands.get_indexer(df['name'])
+        data = np.ones(len(df), dtype=np.float64)
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(self.states), len(self.brands)))
+
+    def _normalized(self, matrix, norm):
+        if norm == 'l2':
+            scale = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        else:
+            scale = np.asarray(matrix.sum(axis=1)).ravel()
+        scale[scale == 0] = 1
+        return sparse.diags(1 / scale) @ matrix
+
+    def _refresh(self, states=None):
+        unit = self._normalized(self.counts, 'l2').tocsr()
+        shares = self._normalized(self.counts, 'l1').tocsr()
+        if states is None:
+            self.cosine = (unit @ unit.T).toarray()
+            self.js = self._js_divergence(shares)
+        else:
+            # Only the rows/columns of the touched states change
+            rows = unit[states] @ unit.T
+            self.cosine[states, :] = rows.toarray()
+            self.cosine[:, states] = rows.toarray().T
+            js = self._js_divergence(shares, states)
+            self.js[states, :] = js
+            self.js[:, states] = js.T
+        self._brand_unit = self._normalized(self.counts.T.tocsr(), 'l2').tocsr()
+
+    @staticmethod
+    def _kl_to_midpoint(shares, rows, targets=None):
+        # KL(p_s || (p_s + p_t) / 2) for s in rows and t in targets (every state
+        # by default), summed only over the brands where p_s > 0, i.e. over the
+        # sparse entries of shares[rows]
+        subset = shares[rows].tocoo()
+        target_shares = shares if targets is None else shares[targets]
+        columns = target_shares.tocsc()[:, subset.col].toarray()  # targets x nnz
+        p = subset.data[np.newaxis, :]
+        terms = p * np.log(2 * p / (p + columns))
+        kl = np.zeros((len(rows), target_shares.shape[0]))
+        np.add.at(kl.T, (slice(None), subset.row), terms)
+        return kl
+
+    def _js_divergence(self, shares, rows=None):
+        all_rows = np.arange(shares.shape[0])
+        if rows is None:
+            kl = self._kl_to_midpoint(shares, all_rows)
+            return np.clip((kl + kl.T) / 2, 0, None)
+        rows = np.asarray(rows)
+        forward = self._kl_to_midpoint(shares, rows)
+        # KL of every state to its midpoint with each touched state only
+        backward = self._kl_to_midpoint(shares, all_rows, rows).T
+        return np.clip((forward + backward) / 2, 0, None)
+
+    def add_locations(self, df):
+        """Add new rows and refresh the similarities of the states they touch."""
+        new_states = df['province'].dropna().unique()
+        new_brands = df['name'].dropna().unique()
+        if (self.states.get_indexer(new_states) < 0).any() or (self.brands.get_indexer(new_brands) < 0).any():
+            # Unknown state or brand changes the matrix shape; rebuild
+            old = self._to_frame()
+            self.states = self.states.union(new_states)
+            self.brands = self.brands.union(new_brands)
+            self.counts = self._count_matrix(old) + self._count_matrix(df)
+            self._refresh()
+            return
+        self.counts = self.counts + self._count_matrix(df)
+        self._refresh(self.states.get_indexer(new_states))
+
+    def _to_frame(self):
+        coo = self.counts.tocoo()
+        return pd.DataFrame({
+            'province': np.repeat(self.states[coo.row], coo.data.astype(int)),
+            'name': np.repeat(self.brands[coo.col], coo.data.astype(int)),
+        })
+
+    def similarity(self, states=None, metric='cosine'):
+        """State x state similarity (cosine) or divergence (``'js'``) frame."""
+        matrix = self.cosine if metric == 'cosine' else self.js
+        frame = pd.DataFrame(matrix, index=self.states, columns=self.states)
+        if states is not None:
+            frame = frame.loc[states, states]
+        return frame
+
+    def brand_affinity(self, brand, n=10, min_locations=10):
+        """Brands whose state footprint is most similar to ``brand``.
+
+        Brands with fewer than ``min_locations`` locations are skipped, since a
+        single location makes any footprint look identical.
+        """
+        b = self.brands.get_loc(brand)
+        scores = (self._brand_unit @ self._brand_unit[b].T).toarray().ravel()
+        scores[np.asarray(self.counts.sum(axis=0)).ravel() < min_locations] = -1
+        scores[b] = -1
+        top = np.argsort(-scores)[:n]
+        return pd.Series(scores[top], index=self.brands[top], name='Affinity')
+
+    def taste_regions(self, n_regions=6):
+        """Cluster the states by their brand mix.
+
+        Uses Ward linkage on the square roots of the brand shares, i.e. on the
+        Hellinger distance, which like Jensen-Shannon compares distributions
+        but is Euclidean and so keeps Ward's compact, balanced clusters.
+        """
+        shares = self._normalized(self.counts, 'l1')
+        tree = hierarchy.linkage(np.sqrt(shares.toarray()), method='ward')
+        labels = hierarchy.fcluster(tree, t=n_regions, criterion='maxclust')
+        return pd.Series(labels, index=self.states, name='Region')
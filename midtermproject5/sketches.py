@@ -0,0 +1,234 @@
+"""Mergeable sketches for approximate dashboard statistics.
+
+Every (state, brand) pair keeps a small summary of its rows: HyperLogLog
+registers for distinct counts, a fixed-width histogram for coordinate
+quantiles, and exact count/sum/min/max moments. Any combination of the
+state and brand filters is answered by merging the summaries of the
+matching pairs instead of scanning the rows again.
+
+Most pairs have a handful of locations, so their HyperLogLog registers
+are kept sparse: only the (register, rank) entries that are set, at most
+one per distinct value. Dense registers exist only per state and for the
+whole dataset, so memory grows with the number of distinct values rather
+than with pairs x registers. A brand filter merges the sparse entries of
+that brand's pairs, taking the maximum rank per register.
+"""
+
+import numpy as np
+import pandas as pd
+
+# 2^10 registers per column and pair -> about 3.3% standard error
+HLL_PRECISION = 10
+# Width (in degrees) of the coordinate histogram bins
+QUANTILE_BIN_WIDTH = 0.05
+# Per pair moments kept for each numeric column
+MOMENTS = ('count', 'sum', 'min', 'max', 'sumsq')
+
+
+def _hll_ranks(values, precision):
+    # Hash each value to 64 bits and split it into a register index and the
+    # position of the first set bit in the remaining bits
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    rank = np.where(rest == 0, 64 - precision + 1, 64 - bit_length + 1)
+    return index, rank.astype(np.uint8)
+
+
+def _hll_estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zeros = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and zeros > 0:
+        # Small range correction (linear counting)
+        estimate = m * np.log(m / zeros)
+    return estimate
+
+
+class SketchIndex:
+    """Per (state, brand) sketches that can be merged for any filter."""
+
+    def __init__(self, df, distinct_columns=('name', 'province', 'city'),
+                 numeric_columns=('latitude', 'longitude'),
+                 precision=HLL_PRECISION, bin_width=QUANTILE_BIN_WIDTH):
+        self.precision = precision
+        self.bin_width = bin_width
+        self.distinct_columns = [c for c in distinct_columns if c in df.columns]
+        self.numeric_columns = [c for c in numeric_columns if c in df.columns]
+
+        groups = df.groupby(['province', 'name'], dropna=False, sort=True)
+        pair_codes = groups.ngroup().to_numpy()
+        self.pairs = groups.size().reset_index(name='count')
+        n_pairs = len(self.pairs)
+
+        # Missing values per pair, summed over all columns
+        self.missing = (df.isnull().sum(axis=1)
+                        .groupby(pair_codes).sum()
+                        .reindex(range(n_pairs), fill_value=0).to_numpy())
+
+        # Sparse HyperLogLog entries per pair, sorted by pair * m + register,
+        # with dense registers per state and overall built from them
+        m = 1 << precision
+        self._state_codes, self._states = pd.factorize(self.pairs['province'])
+        self._entries = {}
+        self._state_registers = {}
+        self._total_registers = {}
+        for column in self.distinct_columns:
+            values = df[column]
+            present = values.notna().to_numpy()
+            index, rank = _hll_ranks(values[present].astype(str), precision)
+            keys = pair_codes[present].astype(np.int64) * m + index
+            # Highest rank per (pair, register): sort by key then rank, keep the last
+            order = np.lexsort((rank, keys))
+            keys, rank = keys[order], rank[order]
+            last = np.r_[keys[1:] != keys[:-1], True] if len(keys) else np.zeros(0, dtype=bool)
+            keys, rank = keys[last], rank[last]
+            self._entries[column] = (keys, rank)
+
+            entry_pairs, entry_registers = np.divmod(keys, m)
+            entry_states = self._state_codes[entry_pairs]
+            known = entry_states >= 0
+            state_registers = np.zeros((len(self._states), m), dtype=np.uint8)
+            np.maximum.at(state_registers, (entry_states[known], entry_registers[known]), rank[known])
+            total = np.zeros(m, dtype=np.uint8)
+            np.maximum.at(total, entry_registers, rank)
+            self._state_registers[column] = state_registers
+            self._total_registers[column] = total
+
+        # Exact moments and sparse histograms per pair for numeric columns
+        self.moments = {}
+        self.histograms = {}
+        for column in self.numeric_columns:
+            values = df[column]
+            stats = values.groupby(pair_codes).agg(['count', 'sum', 'min', 'max'])
+            stats['sumsq'] = (values * values).groupby(pair_codes).sum()
+            self.moments[column] = stats.reindex(range(n_pairs))
+            present = values.notna().to_numpy()
+            bins = np.floor(values[present].to_numpy() / bin_width).astype(np.int64)
+            self.histograms[column] = (pd.Series(1, index=pd.MultiIndex.from_arrays(
+                [pair_codes[present], bins], names=['pair', 'bin']))
+                .groupby(level=['pair', 'bin']).sum())
+
+    def arrays(self):
+        """The sketches as a flat dict of arrays, for ``from_arrays``.
+
+        Pair labels are object arrays; the settings are 0-d or 1-d arrays.
+        """
+        arrays = {
+            'precision': np.array(self.precision),
+            'bin_width': np.array(self.bin_width),
+            'distinct_columns': np.array(self.distinct_columns, dtype=object),
+            'numeric_columns': np.array(self.numeric_columns, dtype=object),
+            'pair_states': self.pairs['province'].to_numpy(dtype=object),
+            'pair_brands': self.pairs['name'].to_numpy(dtype=object),
+            'pair_counts': self.pairs['count'].to_numpy(),
+            'missing': self.missing,
+        }
+        for column in self.distinct_columns:
+            arrays[f"keys_{column}"], arrays[f"rank_{column}"] = self._entries[column]
+            arrays[f"state_registers_{column}"] = self._state_registers[column]
+            arrays[f"total_registers_{column}"] = self._total_registers[column]
+        for column in self.numeric_columns:
+            for stat in MOMENTS:
+                arrays[f"{stat}_{column}"] = self.moments[column][stat].to_numpy()
+            histogram = self.histograms[column]
+            arrays[f"hist_pair_{column}"] = histogram.index.get_level_values('pair').to_numpy()
+            arrays[f"hist_bin_{column}"] = histogram.index.get_level_values('bin').to_numpy()
+            arrays[f"hist_count_{column}"] = histogram.to_numpy()
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Sketches over the arrays of ``arrays()``."""
+        index = cls.__new__(cls)
+        index.precision = int(arrays['precision'])
+        index.bin_width = float(arrays['bin_width'])
+        index.distinct_columns = list(arrays['distinct_columns'])
+        index.numeric_columns = list(arrays['numeric_columns'])
+        index.pairs = pd.DataFrame({'province': arrays['pair_states'], 'name': arrays['pair_brands'],
+                                    'count': arrays['pair_counts']})
+        index.missing = arrays['missing']
+        index._state_codes, index._states = pd.factorize(index.pairs['province'])
+        index._entries, index._state_registers, index._total_registers = {}, {}, {}
+        for column in index.distinct_columns:
+            index._entries[column] = (arrays[f"keys_{column}"], arrays[f"rank_{column}"])
+            index._state_registers[column] = arrays[f"state_registers_{column}"]
+            index._total_registers[column] = arrays[f"total_registers_{column}"]
+        index.moments, index.histograms = {}, {}
+        for column in index.numeric_columns:
+            index.moments[column] = pd.DataFrame({stat: arrays[f"{stat}_{column}"] for stat in MOMENTS})
+            index.histograms[column] = pd.Series(arrays[f"hist_count_{column}"], index=pd.MultiIndex.from_arrays(
+                [arrays[f"hist_pair_{column}"], arrays[f"hist_bin_{column}"]], names=['pair', 'bin']))
+        return index
+
+    def select(self, state=None, brand=None):
+        """Return the positions of the pairs matching the filters."""
+        mask = np.ones(len(self.pairs), dtype=bool)
+        if state is not None:
+            mask &= (self.pairs['province'] == state).to_numpy()
+        if brand is not None:
+            mask &= (self.pairs['name'] == brand).to_numpy()
+        return np.flatnonzero(mask)
+
+    @property
+    def distinct_error(self):
+        """Relative standard error of the distinct count estimates."""
+        return 1.04 / np.sqrt(1 << self.precision)
+
+    def count(self, state=None, brand=None):
+        return int(self.pairs['count'].to_numpy()[self.select(state, brand)].sum())
+
+    def missing_values(self, state=None, brand=None):
+        return int(self.missing[self.select(state, brand)].sum())
+
+    def distinct(self, column, state=None, brand=None):
+        """Estimate the number of distinct values of a column."""
+        if column not in self.distinct_columns:
+            raise ValueError(f"no sketch for column {column!r}")
+        if state is None and brand is None:
+            return int(round(_hll_estimate(self._total_registers[column])))
+        if brand is None:
+            if state not in self._states:
+                return 0
+            return int(round(_hll_estimate(self._state_registers[column][self._states.get_loc(state)])))
+        pairs = self.select(state, brand)
+        if len(pairs) == 0:
+            return 0
+        m = 1 << self.precision
+        keys, rank = self._entries[column]
+        starts = np.searchsorted(keys, pairs.astype(np.int64) * m)
+        ends = np.searchsorted(keys, (pairs.astype(np.int64) + 1) * m)
+        selected = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])
+        merged = np.zeros(m, dtype=np.uint8)
+        np.maximum.at(merged, keys[selected] % m, rank[selected])
+        return int(round(_hll_estimate(merged)))
+
+    def describe(self, state=None, brand=None):
+        """Approximate equivalent of ``DataFrame.describe()`` for the numeric columns.
+
+        Count, mean, std, min and max are exact; the quartiles come from the
+        merged histograms and are within half a bin width of the exact
+        nearest-rank quartiles.
+        """
+        pairs = self.select(state, brand)
+        result = {}
+        for column in self.numeric_columns:
+            stats = self.moments[column].iloc[pairs]
+            n = stats['count'].sum()
+            mean = stats['sum'].sum() / n if n else np.nan
+            var = (stats['sumsq'].sum() - n * mean * mean) / (n - 1) if n > 1 else np.nan
+            hist = self.histograms[column]
+            merged = hist[hist.index.get_level_values('pair').isin(pairs)].groupby(level='bin').sum()
+            cumulative = merged.cumsum().to_numpy()
+            quartiles = []
+            for q in (0.25, 0.5, 0.75):
+                if n == 0:
+                    quartiles.append(np.nan)
+                    continue
+                position = np.searchsorted(cumulative, q * n)
+                quartiles.append((merged.index[position] + 0.5) * self.bin_width)
+            result[column] = [n, mean, np.sqrt(max(var, 0)), stats['min'].min(),
+                              *quartiles, stats['max'].max()]
+        return pd.DataFrame(result, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
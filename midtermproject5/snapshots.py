@@ -0,0 +1,162 @@
+"""Versioned store of dated restaurant feed snapshots.
+
+Each ingested snapshot is diffed against the previous one on the ``keys``
+column and only the delta is written: rows that were added or changed,
+plus the keys that disappeared. Every ``checkpoint_every`` snapshots a full
+copy is written instead, so rebuilding any version reads one checkpoint
+and a bounded number of deltas.
+
+Per-snapshot (state, brand) location counts are stored separately in
+``aggregates.parquet``, so market-share and location-count trends are
+answered without touching the snapshots themselves.
+
+Usage:
+    python snapshots.py ingest FastFoodRestaurants.csv --date 2025-01-06 --store snapshots
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+KEY_COLUMN = 'keys'
+MANIFEST = 'manifest.json'
+AGGREGATES = 'aggregates.parquet'
+
+
+class SnapshotStore:
+    """Directory of checkpointed and delta-compressed snapshots."""
+
+    def __init__(self, directory, checkpoint_every=12):
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.snapshots = json.load(f)
+        else:
+            self.snapshots = []
+
+    @property
+    def dates(self):
+        return [s['date'] for s in self.snapshots]
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write_manifest(self):
+        tmp_path = self._path(MANIFEST + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshots, f, indent=2)
+        os.replace(tmp_path, self._path(MANIFEST))
+
+    def load(self, date=None):
+        """Rebuild the full snapshot for ``date`` (the latest by default)."""
+        if not self.snapshots:
+            raise KeyError("the snapshot store is empty")
+        position = len(self.snapshots) - 1 if date is None else self.dates.index(date)
+        start = max(i for i in range(position + 1) if self.snapshots[i]['kind'] == 'full')
+        frame = pd.read_parquet(self._path(self.snapshots[start]['file'])).set_index(KEY_COLUMN)
+        for entry in self.snapshots[start + 1:position + 1]:
+            delta = pd.read_parquet(self._path(entry['file']))
+            removed = delta.loc[delta['_removed'], KEY_COLUMN]
+            upserts = delta.loc[~delta['_removed']].drop(columns='_removed').set_index(KEY_COLUMN)
+            frame = frame.drop(index=removed, errors='ignore')
+            frame = pd.concat([frame.drop(index=upserts.index, errors='ignore'), upserts])
+        return frame.reset_index()
+
+    def ingest(self, df, date):
+        """Add ``df`` as the snapshot for ``date`` (ISO format, increasing)."""
+        date = str(pd.Timestamp(date).date())
+        if self.snapshots and date <= self.dates[-1]:
+            raise ValueError(f"snapshot {date} is not newer than {self.dates[-1]}")
+        os.makedirs(self.directory, exist_ok=True)
+        df = df.copy()
+        df.columns = df.columns.str.strip()
+        df = df.drop_duplicates(KEY_COLUMN, keep='last')
+
+        since_checkpoint = 0
+        for entry in reversed(self.snapshots):
+            if entry['kind'] == 'full':
+                break
+            since_checkpoint += 1
+
+        if not self.snapshots or since_checkpoint + 1 >= self.checkpoint_every:
+            kind, file_name = 'full', f"full-{date}.parquet"
+            df.to_parquet(self._path(file_name), index=False)
+            stats = {'rows': len(df)}
+        else:
+            kind, file_name = 'delta', f"delta-{date}.parquet"
+            delta, stats = self._diff(self.load().set_index(KEY_COLUMN), df.set_index(KEY_COLUMN))
+            delta.to_parquet(self._path(file_name), index=False)
+
+        self._append_aggregates(df, date)
+        self.snapshots.append({'date': date, 'kind': kind, 'file': file_name, **stats})
+        self._write_manifest()
+        return self.snapshots[-1]
+
+    def _diff(self, previous, current):
+        columns = current.columns.union(previous.columns)
+        previous = previous.reindex(columns=columns)
+        current = current.reindex(columns=columns)
+        added = current.index.difference(previous.index)
+        removed = previous.index.difference(current.index)
+        common = current.index.intersection(previous.index)
+        old, new = previous.loc[common], current.loc[common]
+        differs = (old != new) & ~(old.isna() & new.isna())
+        changed = common[differs.any(axis=1).to_numpy()]
+
+        upserts = current.loc[added.append(changed)].reset_index()
+        upserts['_removed'] = False
+        deletions = pd.DataFrame({KEY_COLUMN: removed, '_removed': True})
+        delta = pd.concat([upserts, deletions], ignore_index=True)
+        stats = {'rows': len(current), 'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+        return delta, stats
+
+    def _append_aggregates(self, df, date):
+        counts = df.groupby(['province', 'name']).size().rename('count').reset_index()
+        counts.insert(0, 'date', pd.Timestamp(date))
+        path = self._path(AGGREGATES)
+        if os.path.exists(path):
+            counts = pd.concat([pd.read_parquet(path), counts], ignore_index=True)
+        counts.to_parquet(path, index=False)
+
+    def aggregates(self):
+        path = self._path(AGGREGATES)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['date', 'province', 'name', 'count'])
+        return pd.read_parquet(path)
+
+    def brand_trends(self, brands=None, state=None):
+        """Locations and market share (%) per brand and snapshot date.
+
+        Returns two date x brand frames: location counts and market share.
+        """
+        counts = self.aggregates()
+        if state is not None:
+            counts = counts[counts['province'] == state]
+        table = counts.pivot_table(index='date', columns='name', values='count', aggfunc='sum', fill_value=0)
+        share = table.div(table.sum(axis=1), axis=0) * 100
+        if brands is not None:
+            table, share = table.reindex(columns=brands, fill_value=0), share.reindex(columns=brands, fill_value=0)
+        return table, share.round(2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage dated snapshots of the restaurant feed.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ingest = subparsers.add_parser('ingest', help="add a CSV snapshot to the store")
+    ingest.add_argument('csv')
+    ingest.add_argument('--date', required=True)
+    ingest.add_argument('--store', default='snapshots')
+    ingest.add_argument('--checkpoint-every', type=int, default=12)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store, args.checkpoint_every)
+    entry = store.ingest(pd.read_csv(args.csv), args.date)
+    print(json.dumps(entry))
+
+
+if __name__ == '__main__':
+    main()
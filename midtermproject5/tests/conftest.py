@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The dashboard modules live next to app.py, not in an installed package
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+DATA = os.path.join(APP_DIR, 'FastFoodRestaurants.csv')
+
+
+@pytest.fixture(scope='session')
+def restaurants():
+    """The dashboard's columns of the bundled dataset, compacted as the app does."""
+    from dataset import DASHBOARD_COLUMNS, compact_strings, read_restaurants
+    return compact_strings(read_restaurants(DATA, DASHBOARD_COLUMNS))
@@ -0,0 +1,82 @@
+"""Parameter validation and answers of the JSON API."""
+
+import json
+
+import numpy as np
+import pytest
+
+from api import MAX_LIMIT, QueryEngine, QueryError, ResponseCache
+from conftest import DATA
+from dataset import read_restaurants
+
+
+@pytest.fixture(scope='module')
+def cache():
+    return ResponseCache(QueryEngine(read_restaurants(DATA)))
+
+
+def get(cache, path, query=''):
+    status, body, _ = cache.get(path, query)
+    return status, json.loads(body)
+
+
+@pytest.mark.parametrize('query', [
+    'lon=-74',                  # missing lat
+    'lat=abc&lon=-74',
+    'lat=nan&lon=-74',
+    'lat=inf&lon=-74',
+    'lat=-inf&lon=-74',
+    'lat=91&lon=-74',
+    'lat=40&lon=-180.5',
+    'lat=40&lon=-74&k=x',
+    'lat=40&lon=-74&brand=No Such Brand',
+])
+def test_nearest_rejects_invalid_parameters(cache, query):
+    status, payload = get(cache, '/nearest', query)
+    assert status == 400
+    assert 'error' in payload
+
+
+@pytest.mark.parametrize('path, query', [
+    ('/brands/top', 'state=ZZ'),
+    ('/brands/top', 'n=ten'),
+    ('/states', 'brand=No Such Brand'),
+    ('/states/compare', ''),
+    ('/states/compare', 'states=CA,ZZ'),
+    ('/locations', 'offset=-'),
+])
+def test_queries_reject_invalid_parameters(cache, path, query):
+    assert get(cache, path, query)[0] == 400
+
+
+def test_unknown_endpoint(cache):
+    assert get(cache, '/nope')[0] == 404
+
+
+def test_limits_are_clamped(cache):
+    status, payload = get(cache, '/locations', 'limit=100000')
+    assert status == 200
+    assert len(payload['locations']) == MAX_LIMIT
+    status, payload = get(cache, '/nearest', 'lat=40.7&lon=-74&k=0')
+    assert status == 200
+    assert len(payload['locations']) == 1
+
+
+def test_nearest_is_sorted_and_matches_brute_force(cache):
+    status, payload = get(cache, '/nearest', 'lat=40.7128&lon=-74.006&k=5')
+    assert status == 200
+    distances = [location['distance_km'] for location in payload['locations']]
+    assert distances == sorted(distances)
+
+    store = cache.engine.store
+    lat, lon = np.radians(store.latitude.astype(np.float64)), np.radians(store.longitude.astype(np.float64))
+    # Haversine distance from the query point to every location
+    h = (np.sin((lat - np.radians(40.7128)) / 2) ** 2
+         + np.cos(lat) * np.cos(np.radians(40.7128)) * np.sin((lon - np.radians(-74.006)) / 2) ** 2)
+    brute_force = np.sort(2 * 6371.0088 * np.arcsin(np.sqrt(h)))[:5]
+    assert distances == pytest.approx(brute_force, abs=1e-3)
+
+
+def test_export_rejects_unknown_format(cache):
+    with pytest.raises(QueryError):
+        cache.engine.export({'format': 'xlsx'})
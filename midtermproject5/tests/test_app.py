@@ -0,0 +1,51 @@
+"""The dashboard script run end to end through Streamlit's AppTest."""
+
+import io
+import os
+from unittest import mock
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_DIR, DATA
+
+
+@pytest.fixture
+def deferred_downloads():
+    """file id -> (media file manager, callable) of every deferred download."""
+    downloads = {}
+    add_deferred = MediaFileManager.add_deferred
+
+    def capture(manager, data_callable, *args, **kwargs):
+        file_id = add_deferred(manager, data_callable, *args, **kwargs)
+        downloads[file_id] = (manager, data_callable)
+        return file_id
+
+    with mock.patch.object(MediaFileManager, 'add_deferred', capture):
+        yield downloads
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('FASTFOOD_DATA', DATA)
+    at = AppTest.from_file(os.path.join(APP_DIR, 'app.py'), default_timeout=300)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_export_download(app, deferred_downloads):
+    app.get('download_button')[0].click().run()
+    assert not app.exception
+    file_id = app.get('download_button')[0].proto.deferred_file_id
+    manager, data_callable = deferred_downloads[file_id]
+
+    # What Streamlit does on the click: raises for data it cannot serve
+    manager.execute_deferred(file_id)
+    data, _ = convert_data_to_bytes_and_infer_mime(data_callable(), unsupported_error=TypeError())
+    exported = pd.read_csv(io.BytesIO(data))
+    assert len(exported) == len(pd.read_csv(DATA))
+    assert exported['name'].tolist() == pd.read_csv(DATA)['name'].tolist()
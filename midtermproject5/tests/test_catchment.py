@@ -0,0 +1,65 @@
+"""Catchment population against a brute-force great-circle sum."""
+
+import numpy as np
+import pytest
+
+from catchment import EARTH_RADIUS_KM, KM_PER_DEGREE, MIN_CELLS_PER_RADIUS, PopulationGrid
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+def brute_force(points, longitude, latitude, radius_km):
+    p_lon, p_lat, population = points
+    distances = haversine_km(longitude[:, None], latitude[:, None], p_lon[None, :], p_lat[None, :])
+    return np.where(distances <= radius_km, population[None, :], 0).sum(axis=1)
+
+
+@pytest.fixture(scope='module')
+def points():
+    # Population points around two metro areas
+    rng = np.random.default_rng(0)
+    centres = np.array([[-74.0, 40.7], [-118.2, 34.05]])
+    centre = centres[rng.integers(0, len(centres), 20_000)]
+    lon, lat = (centre + rng.normal(0, 0.3, centre.shape)).T
+    return lon, lat, rng.integers(1, 500, len(lon)).astype(np.float64)
+
+
+@pytest.fixture(scope='module')
+def grid(points):
+    return PopulationGrid(*points)
+
+
+@pytest.fixture(scope='module')
+def locations(points):
+    rng = np.random.default_rng(1)
+    lon, lat, _ = points
+    pick = rng.choice(len(lon), 200, replace=False)
+    return lon[pick] + rng.normal(0, 0.01, 200), lat[pick] + rng.normal(0, 0.01, 200)
+
+
+@pytest.mark.parametrize('radius_km', [0.5, 1, 3, 8])
+def test_small_radii_are_exact(grid, points, locations, radius_km):
+    assert radius_km < MIN_CELLS_PER_RADIUS * grid.cell_degrees * KM_PER_DEGREE
+    longitude, latitude = locations
+    expected = brute_force(points, longitude, latitude, radius_km)
+    assert np.allclose(grid.catchment(longitude, latitude, radius_km), expected)
+
+
+@pytest.mark.parametrize('radius_km', [15, 40])
+def test_large_radii_are_close(grid, points, locations, radius_km):
+    longitude, latitude = locations
+    expected = brute_force(points, longitude, latitude, radius_km)
+    result = grid.catchment(longitude, latitude, radius_km)
+    # The raster rounds the disk edge to whole cells
+    assert np.median(np.abs(result - expected) / expected) < 0.05
+
+
+def test_missing_coordinates_are_nan(grid):
+    result = grid.catchment(np.array([-74.0, np.nan]), np.array([40.7, 40.7]), 1)
+    assert result[0] > 0 and np.isnan(result[1])
+    result = grid.catchment(np.array([-74.0, np.nan]), np.array([40.7, 40.7]), 20)
+    assert result[0] > 0 and np.isnan(result[1])
@@ -0,0 +1,64 @@
+"""Streamed exports read back to the rows they were made from."""
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import decode_strings
+from export import EXPORT_FORMATS
+
+
+def export(df, rows, export_format, chunk_size):
+    exporter, _, _ = EXPORT_FORMATS[export_format]
+    return b''.join(exporter(df, rows, chunk_size=chunk_size))
+
+
+@pytest.fixture(scope='module')
+def rows(restaurants):
+    # A filter result: positions in file order, not contiguous
+    return np.flatnonzero((restaurants['province'] == 'CA').to_numpy())
+
+
+@pytest.mark.parametrize('chunk_size', [100, 10 ** 6])
+def test_csv_round_trip(restaurants, rows, chunk_size):
+    exported = pd.read_csv(io.BytesIO(export(restaurants, rows, 'csv', chunk_size)), dtype={'postalCode': str})
+    expected = decode_strings(restaurants.iloc[rows]).reset_index(drop=True)
+    assert list(exported.columns) == list(expected.columns)
+    assert len(exported) == len(rows)
+    for column in ['name', 'city', 'postalCode']:
+        assert exported[column].fillna('').tolist() == expected[column].fillna('').tolist()
+    assert np.allclose(exported['latitude'], expected['latitude'])
+
+
+@pytest.mark.parametrize('chunk_size', [100, 10 ** 6])
+def test_parquet_round_trip(restaurants, rows, chunk_size):
+    exported = pd.read_parquet(io.BytesIO(export(restaurants, rows, 'parquet', chunk_size)))
+    expected = restaurants.iloc[rows].reset_index(drop=True)
+    assert len(exported) == len(rows)
+    assert exported['name'].astype(object).tolist() == expected['name'].astype(object).tolist()
+    assert np.array_equal(exported['longitude'], expected['longitude'])
+
+
+@pytest.mark.parametrize('chunk_size', [100, 10 ** 6])
+def test_geojson_round_trip(restaurants, rows, chunk_size):
+    collection = json.loads(export(restaurants, rows, 'geojson', chunk_size))
+    expected = restaurants.iloc[rows].dropna(subset=['latitude', 'longitude'])
+    features = collection['features']
+    assert len(features) == len(expected)
+    assert [f['properties']['name'] for f in features] == expected['name'].astype(object).tolist()
+    coordinates = np.array([f['geometry']['coordinates'] for f in features])
+    assert np.allclose(coordinates, expected[['longitude', 'latitude']].to_numpy())
+
+
+@pytest.mark.parametrize('export_format', list(EXPORT_FORMATS))
+def test_empty_selection_is_valid(restaurants, export_format):
+    data = export(restaurants, np.array([], dtype=np.int64), export_format, 1000)
+    if export_format == 'csv':
+        assert len(pd.read_csv(io.BytesIO(data))) == 0
+    elif export_format == 'parquet':
+        assert len(pd.read_parquet(io.BytesIO(data))) == 0
+    else:
+        assert json.loads(data)['features'] == []
@@ -0,0 +1,57 @@
+"""HyperLogLog distinct counts and quantiles of the sketch index."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import SketchIndex
+
+
+@pytest.fixture(scope='module')
+def sketches(restaurants):
+    return SketchIndex(restaurants)
+
+
+def within_error(estimate, exact, sketches):
+    # Three standard errors, plus one for rounding the small counts
+    return abs(estimate - exact) <= 3 * sketches.distinct_error * exact + 1
+
+
+@pytest.mark.parametrize('state, brand', [(None, None), ('CA', None), ('TX', None),
+                                          (None, "McDonald's"), ('NY', 'Subway')])
+@pytest.mark.parametrize('column', ['name', 'city'])
+def test_distinct_matches_exact_count(restaurants, sketches, column, state, brand):
+    rows = restaurants
+    if state is not None:
+        rows = rows[rows['province'] == state]
+    if brand is not None:
+        rows = rows[rows['name'] == brand]
+    assert within_error(sketches.distinct(column, state, brand), rows[column].nunique(), sketches)
+
+
+def test_distinct_large_cardinality():
+    # Past the linear counting range, where the raw HyperLogLog estimate is used
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 10 ** 9, 100_000).astype(str)
+    df = pd.DataFrame({'name': values, 'province': rng.choice(['CA', 'TX'], len(values)),
+                       'latitude': 0.0, 'longitude': 0.0})
+    sketches = SketchIndex(df, distinct_columns=('name',))
+    assert within_error(sketches.distinct('name'), len(np.unique(values)), sketches)
+    assert within_error(sketches.distinct('name', 'CA'), df.loc[df['province'] == 'CA', 'name'].nunique(), sketches)
+
+
+def test_describe_quartiles_within_half_a_bin(restaurants, sketches):
+    approximate = sketches.describe('CA')
+    exact = restaurants.loc[restaurants['province'] == 'CA', ['latitude', 'longitude']]
+    for column in ['latitude', 'longitude']:
+        assert approximate.loc['count', column] == exact[column].count()
+        assert approximate.loc['mean', column] == pytest.approx(exact[column].mean())
+        for q, label in ((0.25, '25%'), (0.5, '50%'), (0.75, '75%')):
+            nearest_rank = exact[column].quantile(q, interpolation='lower')
+            assert abs(approximate.loc[label, column] - nearest_rank) <= sketches.bin_width / 2 + 1e-9
+
+
+def test_arrays_round_trip(sketches):
+    restored = SketchIndex.from_arrays(sketches.arrays())
+    assert restored.distinct('city', None, 'KFC') == sketches.distinct('city', None, 'KFC')
+    assert restored.describe('TX').equals(sketches.describe('TX'))
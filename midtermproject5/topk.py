@@ -0,0 +1,59 @@
+"""Top-K selection over integer-coded group counts.
+
+``top_k`` finds the K largest of n counts with a partial selection
+(``np.partition``, O(n)) and only sorts those K, instead of sorting all n.
+``top_k_per_group`` answers "top K items within every group" (e.g. the top
+8 brands of every state) in one vectorized call over the non-zero entries
+of a group x item count matrix.
+
+Ties are broken by the lower code, so results are deterministic.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def top_k(counts, k):
+    """Codes of the ``k`` largest counts, largest first."""
+    counts = np.asarray(counts)
+    k = min(k, len(counts))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+    above = np.flatnonzero(counts > kth)
+    ties = np.flatnonzero(counts == kth)[:k - len(above)]
+    candidates = np.concatenate([above, ties])
+    return candidates[np.lexsort((candidates, -counts[candidates]))]
+
+
+def top_counts(counts, labels, k):
+    """Series of the ``k`` largest non-zero counts indexed by their labels."""
+    codes = top_k(counts, k)
+    codes = codes[np.asarray(counts)[codes] > 0]
+    return pd.Series(np.asarray(counts)[codes], index=pd.Index(np.asarray(labels, dtype=object)[codes]),
+                     name='count')
+
+
+def group_counts(group_codes, item_codes, n_groups, n_items):
+    """Sparse group x item matrix of pair counts (codes of -1 are skipped)."""
+    valid = (group_codes >= 0) & (item_codes >= 0)
+    data = np.ones(np.count_nonzero(valid), dtype=np.int64)
+    return sparse.csr_matrix((data, (group_codes[valid], item_codes[valid])), shape=(n_groups, n_items))
+
+
+def top_k_per_group(matrix, k):
+    """Top ``k`` items of every row of a count matrix.
+
+    Returns ``(groups, items, counts)`` arrays ordered by group, then count
+    descending. Only non-zero entries are considered, so a sparse matrix
+    costs O(nnz log nnz) however many items there are.
+    """
+    coo = sparse.coo_matrix(matrix)
+    nonzero = coo.data > 0
+    groups, items, counts = coo.row[nonzero], coo.col[nonzero], coo.data[nonzero]
+    order = np.lexsort((items, -counts, groups))
+    groups, items, counts = groups[order], items[order], counts[order]
+    starts = np.searchsorted(groups, groups, side='left')
+    keep = np.arange(len(groups)) - starts < k
+    return groups[keep], items[keep], counts[keep]